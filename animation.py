@@ -0,0 +1,216 @@
+import math
+import time
+from framebuffer import framebuffer
+from pokemon import player
+
+FPS = 30    # Default frame rate of animations
+
+
+class scheduler:
+    """Fixed timestep frame scheduler that drops frames instead of falling behind."""
+    def __init__(self, fps=FPS, clock=time.perf_counter, sleep=time.sleep):
+        """
+        Creates a scheduler.
+
+        :param fps: Target frames per second
+        :param clock: Function returning the current time in seconds
+        :param sleep: Function waiting a number of seconds
+        """
+        self.fps = fps
+        self.period = 1 / fps       # Seconds per frame
+        self.clock = clock
+        self.sleep = sleep
+        self.drawn = 0              # Frames drawn over all animations
+        self.dropped = 0            # Frames skipped because drawing fell behind
+
+    def play(self, duration, render, draw):
+        """
+        Function that plays an animation. Frame i is due i frame periods after the start;
+        when drawing a frame takes longer than a period, the frames whose time has passed
+        are skipped, so the animation ends on time. The last frame is always drawn.
+
+        :param duration: Length of the animation in seconds
+        :param render: Function (progress from 0 to 1) -> frame
+        :param draw: Function drawing a frame
+        """
+        count = max(1, round(duration * self.fps))
+        start = self.clock()
+        index = 1
+        while True:
+            draw(render(index / count))
+            self.drawn += 1
+            if index == count:
+                break
+            # Frame whose time slot has started (drawing may have taken several slots)
+            due = min(int((self.clock() - start) / self.period) + 1, count)
+            if due > index + 1:
+                self.dropped += due - index - 1
+                index = due
+            else:
+                index += 1
+            wait = start + (index - 1) * self.period - self.clock()
+            if wait > 0:
+                self.sleep(wait)
+
+
+class battle_scene:
+    """Battle layout of pokemon.render_in_battle with sprites that can move, hide or show other HP."""
+    def __init__(self, Player, Enemy, distance=10):
+        """
+        Creates a battle scene.
+
+        :param Player: Pokemon on the left
+        :param Enemy: Pokemon on the right
+        :param distance: distance between pokemon in battle
+        """
+        self.sprites = {'left': Player.get_sprite(hp=False),
+                        'right': Enemy.get_sprite(hp=False, flipped=isinstance(Enemy, player))}
+        self.hp = {'left': Player.hp, 'right': Enemy.hp}    # HP shown when not changed by an animation
+        self.distance = distance
+        self.buffers = {}           # Sprites with HP ((side, hp) -> framebuffer)
+
+    def buffer(self, side, hp):
+        """
+        Function that gets the sprite of one side with its HP below it (as in pokemon.get_sprite).
+
+        :param side: 'left' or 'right'
+        :param hp: HP to show
+        :return: framebuffer
+        """
+        key = (side, hp)
+        if key not in self.buffers:
+            base = self.sprites[side]
+            self.buffers[key] = base.add_lines([f"HP: {hp}"], spacing=base.spacing).buffer
+        return self.buffers[key]
+
+    def start(self):
+        """
+        Function that gets the state of the scene before any animation.
+
+        :return: Dictionary of side -> {'x': column offset, 'hp': HP, 'visible': bool}
+        """
+        return {side: {'x': 0, 'hp': hp, 'visible': True} for side, hp in self.hp.items()}
+
+    def frame(self, state):
+        """
+        Function that draws the scene.
+        Sprites moved past the edges are cut off, the frame keeps its size.
+
+        :param state: State of both sides (see start)
+        :return: framebuffer
+        """
+        left = self.buffer('left', state['left']['hp'])
+        right = self.buffer('right', state['right']['hp'])
+        height = max(left.height, right.height)
+        canvas = framebuffer(left.width + self.distance + right.width, height)
+        for side, buffer, x in (('left', left, 0), ('right', right, left.width + self.distance)):
+            if state[side]['visible']:
+                canvas = canvas.overlay(buffer, x + state[side]['x'], height - buffer.height)
+        return canvas
+
+
+class animation:
+    """Battle animation made of tracks that change the scene state over time."""
+    def __init__(self, duration, *tracks):
+        """
+        Creates an animation.
+
+        :param duration: Length in seconds
+        :param tracks: Functions (state, progress from 0 to 1) changing the scene state
+        """
+        self.duration = duration
+        self.tracks = tracks
+
+    def render(self, scene, progress):
+        """
+        Function that draws the animation at some point in time.
+
+        :param scene: battle_scene to animate
+        :param progress: Progress from 0 (start) to 1 (end)
+        :return: framebuffer
+        """
+        state = scene.start()
+        for track in self.tracks:
+            track(state, progress)
+        return scene.frame(state)
+
+
+def tween_hp(side, start, end):
+    """
+    Function that creates a track counting the HP of one side from one value to another.
+
+    :param side: 'left' or 'right'
+    :param start: HP at the start
+    :param end: HP at the end
+    :return: Track
+    """
+    def track(state, progress):
+        state[side]['hp'] = round(start + (end - start) * progress)
+    return track
+
+
+def shake(side, amplitude=2, times=3):
+    """
+    Function that creates a track shaking the sprite of one side horizontally.
+
+    :param side: 'left' or 'right'
+    :param amplitude: Largest offset in columns
+    :param times: Shakes back and forth
+    :return: Track
+    """
+    def track(state, progress):
+        state[side]['x'] += round(amplitude * math.sin(2 * math.pi * times * progress))
+    return track
+
+
+def flash(side, times=3):
+    """
+    Function that creates a track blinking the sprite of one side (visible at the end).
+
+    :param side: 'left' or 'right'
+    :param times: Blinks
+    :return: Track
+    """
+    def track(state, progress):
+        state[side]['visible'] = progress >= 1 or int(progress * times * 2) % 2 == 0
+    return track
+
+
+def slide_in(side, distance):
+    """
+    Function that creates a track sliding the sprite of one side in from the edge (slowing down at the end).
+
+    :param side: 'left' or 'right'
+    :param distance: Columns to slide
+    :return: Track
+    """
+    direction = -1 if side == 'left' else 1
+    def track(state, progress):
+        state[side]['x'] += round(direction * distance * (1 - progress) ** 2)
+    return track
+
+
+def hit(side, old_hp, new_hp, duration=0.6):
+    """
+    Function that creates the animation of an attack: the attacked sprite shakes and
+    flashes while its HP counts down.
+
+    :param side: Attacked side ('left' or 'right')
+    :param old_hp: HP before the attack
+    :param new_hp: HP after the attack
+    :param duration: Length in seconds
+    :return: animation
+    """
+    return animation(duration, tween_hp(side, old_hp, new_hp), shake(side), flash(side))
+
+
+def entrance(scene, duration=0.5):
+    """
+    Function that creates the animation of both sprites sliding in from the edges.
+
+    :param scene: battle_scene the sprites enter
+    :param duration: Length in seconds
+    :return: animation
+    """
+    return animation(duration, slide_in('left', scene.sprites['left'].width),
+                     slide_in('right', scene.sprites['right'].width + scene.distance))
@@ -0,0 +1,172 @@
+RESET = '\x1b[0m'
+BLANK = (None, None, ' ')               # Empty cell
+INDEXED = 1 << 25                       # Flag of palette colors (INDEXED | palette index, see palette.py)
+
+# Caches shared by all lines (sprites reuse a small set of colors)
+SEGMENTS = {}       # segment -> (SGR parameters, text)
+STATES = {}         # (SGR parameters, fg, bg) -> (fg, bg)
+TRANSITIONS = {}    # (fg, bg, current fg, current bg) -> SGR sequence
+
+
+def to_rgb(color):
+    """
+    Function that unpacks a packed 0xRRGGBB color.
+
+    :param color: Packed color
+    :return: (r, g, b) tuple
+    """
+    return (color >> 16) & 255, (color >> 8) & 255, color & 255
+
+
+def apply_sgr(params, fg, bg):
+    """
+    Function that applies the parameters of one SGR sequence to a color state.
+    Only color codes are understood (reset, 24-bit, 256 and 16 colors and
+    default colors), other codes are skipped.
+
+    :param params: SGR parameters (text between '\\x1b[' and 'm')
+    :param fg: Current foreground color (packed RGB, None for default)
+    :param bg: Current background color (packed RGB, None for default)
+    :return: New (fg, bg)
+    """
+    codes = params.split(';') if params else ['0']
+    i = 0
+    while i < len(codes):
+        code = codes[i]
+        if code in ('', '0'):
+            fg = bg = None
+        elif code == '39':
+            fg = None
+        elif code == '49':
+            bg = None
+        elif code in ('38', '48') and i + 4 < len(codes) and codes[i+1] == '2':
+            r, g, b = (int(c or 0) for c in codes[i+2:i+5])
+            color = (r << 16) | (g << 8) | b
+            if code == '38':
+                fg = color
+            else:
+                bg = color
+            i += 4
+        elif code in ('38', '48') and i + 2 < len(codes) and codes[i+1] == '5':
+            color = INDEXED | (int(codes[i+2] or 0) & 255)
+            if code == '38':
+                fg = color
+            else:
+                bg = color
+            i += 2
+        elif code.isdigit() and (30 <= int(code) <= 37 or 90 <= int(code) <= 97):
+            fg = INDEXED | (int(code) % 10 + (8 if int(code) >= 90 else 0))
+        elif code.isdigit() and (40 <= int(code) <= 47 or 100 <= int(code) <= 107):
+            bg = INDEXED | (int(code) % 10 + (8 if int(code) >= 100 else 0))
+        i += 1
+    return fg, bg
+
+
+def parse(line):
+    """
+    Function that parses a line of ANSI text into cells in a single pass.
+    A cell is a (foreground, background, glyph) tuple with packed RGB colors
+    (None for the terminal default). The foreground of a space without a
+    background is dropped since it is invisible.
+
+    :param line: Line of text with SGR escape sequences
+    :return: List of cells
+    """
+    segments = line.split('\x1b[')    # Every segment after the first starts with SGR parameters
+    cells = []
+    fg = bg = None
+    for ind, segment in enumerate(segments):
+        if ind:
+            parsed = SEGMENTS.get(segment)
+            if parsed is None:
+                params, _, text = segment.partition('m')
+                parsed = SEGMENTS[segment] = (params, text)
+            params, text = parsed
+            key = (params, fg, bg)
+            state = STATES.get(key)
+            if state is None:
+                state = STATES[key] = apply_sgr(params, fg, bg)
+            fg, bg = state
+        else:
+            text = segment
+        for glyph in text:
+            cells.append(BLANK if glyph == ' ' and bg is None else (fg, bg, glyph))
+    return cells
+
+
+def color_code(color, background=False):
+    """
+    Function that creates the SGR parameters selecting a color.
+    Palette colors 0-15 use the basic codes (30-37, 90-97), other palette colors the 256 color code.
+
+    :param color: Packed RGB color or palette color (INDEXED | index)
+    :param background: bool for a background color
+    :return: SGR parameters
+    """
+    if color & INDEXED:
+        index = color & 255
+        if index < 16:
+            return str((40 if background else 30) + index % 8 + (60 if index >= 8 else 0))
+        return f"{48 if background else 38};5;{index}"
+    return ('48;2;%d;%d;%d' if background else '38;2;%d;%d;%d') % to_rgb(color)
+
+
+def sgr(fg, bg, current_fg, current_bg):
+    """
+    Function that creates the shortest SGR sequence going from one color state to another.
+
+    :param fg: Wanted foreground color
+    :param bg: Wanted background color
+    :param current_fg: Current foreground color
+    :param current_bg: Current background color
+    :return: SGR escape sequence ('' if nothing changes)
+    """
+    codes = []
+    if (fg is None and current_fg is not None) and (bg is None and current_bg is not None):
+        return RESET
+    if fg != current_fg:
+        codes.append('39' if fg is None else color_code(fg))
+    if bg != current_bg:
+        codes.append('49' if bg is None else color_code(bg, background=True))
+    return f"\x1b[{';'.join(codes)}m" if codes else ''
+
+
+def emit(cells):
+    """
+    Function that converts cells to a line of ANSI text with minimal escape sequences.
+    The line ends with the default colors, so lines can be joined freely.
+
+    :param cells: List of (foreground, background, glyph) cells
+    :return: Line of ANSI text
+    """
+    parts = []
+    fg, bg = emit_into(parts, cells, None, None)
+    if fg is not None or bg is not None:
+        parts.append(RESET)
+    return ''.join(parts)
+
+
+def emit_into(parts, cells, fg, bg):
+    """
+    Function that appends the ANSI text of cells to a list of output pieces,
+    starting from a known color state.
+
+    :param parts: List of output pieces to append to
+    :param cells: List of (foreground, background, glyph) cells
+    :param fg: Current foreground color
+    :param bg: Current background color
+    :return: Color state (fg, bg) after the cells
+    """
+    for cell_fg, cell_bg, glyph in cells:
+        if cell_bg is None and glyph == ' ':
+            cell_fg = fg        # Foreground does not matter for an empty space
+        if cell_fg != fg or cell_bg != bg:
+            key = (cell_fg, cell_bg, fg, bg)
+            sequence = TRANSITIONS.get(key)
+            if sequence is None:
+                sequence = TRANSITIONS[key] = sgr(*key)
+            parts.append(sequence)
+            fg, bg = cell_fg, cell_bg
+        parts.append(glyph)
+    return fg, bg
+
@@ -0,0 +1,173 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+from framebuffer import framebuffer
+from sprite import SPRITE_DIR, SPRITE_PACK
+
+MAGIC = b'PKAS'             # Sprite pack file signature
+VERSION = 1
+HEADER = struct.Struct('<4sHI16s')      # Magic, version, sprite count, content hash
+ENTRY = struct.Struct('<HHq16sII')      # Width, height, source mtime, source hash, normal and flipped offsets
+
+
+def to_bytes(buffer):
+    """
+    Function that serializes the cells of a framebuffer (glyphs, foreground, background).
+
+    :param buffer: framebuffer
+    :return: Little endian bytes
+    """
+    data = array('I')
+    for cells in (buffer.glyphs, buffer.fg, buffer.bg):
+        data.extend(cells)
+    if sys.byteorder != 'little':
+        data.byteswap()
+    return data.tobytes()
+
+
+def content_hash(hashes):
+    """
+    Function that combines the hashes of all sprites.
+
+    :param hashes: Dictionary of sprite name -> source hash
+    :return: 16 byte digest
+    """
+    import hashlib     # Only needed to compile and check packs (slow to import)
+    combined = hashlib.blake2b(digest_size=16)
+    for name in sorted(hashes):
+        combined.update(name.encode() + b'\0' + hashes[name])
+    return combined.digest()
+
+
+def compile_pack(source=SPRITE_DIR, path=SPRITE_PACK):
+    """
+    Function that compiles every sprite in a folder into a sprite pack.
+
+    :param source: Folder with ANSI sprite files
+    :param path: Sprite pack path
+    :return: Number of sprites packed
+    """
+    import hashlib
+    names = sorted(name for name in os.listdir(source) if os.path.isfile(os.path.join(source, name)))
+    entries, chunks, hashes = [], [], {}
+    offset = 0
+    for name in names:
+        sprite_path = os.path.join(source, name)
+        with open(sprite_path, 'rb') as sprite_file:
+            raw = sprite_file.read()
+        hashes[name] = hashlib.blake2b(raw, digest_size=16).digest()
+        buffer = framebuffer.from_lines(raw.decode().split('\n'))
+        normal, flipped = to_bytes(buffer), to_bytes(buffer.flip())
+        entries.append((name, buffer.width, buffer.height, os.stat(sprite_path).st_mtime_ns,
+                        hashes[name], offset, offset + len(normal)))
+        chunks += [normal, flipped]
+        offset += len(normal) + len(flipped)
+
+    index = b''.join(struct.pack('<H', len(name.encode())) + name.encode() + ENTRY.pack(*entry)
+                     for name, *entry in entries)
+    # Data offsets are relative to the end of the index
+    with open(path + '.tmp', 'wb') as pack_file:
+        pack_file.write(HEADER.pack(MAGIC, VERSION, len(entries), content_hash(hashes)))
+        pack_file.write(index)
+        for chunk in chunks:
+            pack_file.write(chunk)
+    os.replace(path + '.tmp', path)
+    return len(entries)
+
+
+class sprite_pack:
+    """Memory-mapped sprite pack; sprites are decoded only when asked for."""
+    def __init__(self, path=SPRITE_PACK):
+        """
+        Opens a sprite pack and reads its index.
+
+        :param path: Sprite pack path
+        """
+        self.path = path
+        with open(path, 'rb') as pack_file:
+            self.data = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, self.hash = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"'{path}' is not a sprite pack")
+        if version != VERSION:
+            raise ValueError(f"Unsupported sprite pack version {version} in '{path}'")
+
+        self.entries = {}       # Sprite name -> (width, height, source mtime, source hash, normal and flipped offsets)
+        offset = HEADER.size
+        for _ in range(count):
+            length, = struct.unpack_from('<H', self.data, offset)
+            name = self.data[offset + 2:offset + 2 + length].decode()
+            offset += 2 + length
+            self.entries[name] = ENTRY.unpack_from(self.data, offset)
+            offset += ENTRY.size
+        self.start = offset     # Start of the sprite data
+
+    def __contains__(self, name):
+        return name.lower() in self.entries
+
+    def is_current(self, name, source=SPRITE_DIR):
+        """
+        Function that checks if a packed sprite was made from the current sprite file
+        (a sprite without a source file counts as current).
+
+        :param name: Sprite name
+        :param source: Folder with ANSI sprite files
+        :return: True if the packed sprite can be used
+        """
+        try:
+            mtime = os.stat(os.path.join(source, name.lower())).st_mtime_ns
+        except FileNotFoundError:
+            return True
+        return self.entries[name.lower()][2] == mtime
+
+    def buffer(self, name, flipped=False):
+        """
+        Function that decodes a packed sprite.
+
+        :param name: Sprite name
+        :param flipped: bool for the horizontally flipped sprite
+        :return: framebuffer
+        """
+        width, height, _, _, normal, flipped_offset = self.entries[name.lower()]
+        size = width * height
+        start = self.start + (flipped_offset if flipped else normal)
+        cells = array('I')
+        cells.frombytes(memoryview(self.data)[start:start + 12 * size])
+        if sys.byteorder != 'little':
+            cells.byteswap()
+        return framebuffer(width, height, cells[:size], cells[size:2 * size], cells[2 * size:])
+
+    def close(self):
+        """Function that unmaps the pack."""
+        self.data.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the sprites folder into a memory-mappable sprite pack.")
+    parser.add_argument('--source', default=SPRITE_DIR, help="folder with ANSI sprite files")
+    parser.add_argument('--output', default=SPRITE_PACK, help="sprite pack path")
+    parser.add_argument('--check', action='store_true', help="only check if the pack matches the sprite files")
+    args = parser.parse_args()
+
+    if args.check:
+        import hashlib
+        pack = sprite_pack(args.output)
+        hashes = {}
+        for name in sorted(os.listdir(args.source)):
+            if not os.path.isfile(os.path.join(args.source, name)):
+                continue
+            with open(os.path.join(args.source, name), 'rb') as sprite_file:
+                hashes[name] = hashlib.blake2b(sprite_file.read(), digest_size=16).digest()
+        current = content_hash(hashes) == pack.hash
+        pack.close()
+        print(f"{args.output} is {'up to date' if current else 'outdated'}")
+        sys.exit(0 if current else 1)
+
+    count = compile_pack(args.source, args.output)
+    print(f"Packed {count} sprites into {args.output} ({os.path.getsize(args.output):,} bytes)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+
+MAGIC = b'PKBL'
+VERSION = 1
+RECORD = struct.Struct('<BBHIIIHHI')    # Kind, side, hp, battle, pokemon, other, damage, turn, time
+NAME = struct.Struct('<BBxxI16s')       # Kind, chunk index, name key, 16 byte chunk of the name
+HEADER = struct.Struct('<B3x4sI12x')    # Kind, magic, version
+# Record kinds (fields that are not listed are 0):
+HEADER_KIND = 0     # First record of a file
+START = 1           # pokemon: player, other: enemy, hp: player hp, damage: enemy hp
+ATTACK = 2          # side: attacker, pokemon: attacker, other: move, damage, hp: defender hp left, turn
+SWAP = 3            # pokemon: old player, other: new player, hp: new player hp, turn
+END = 4             # side: winner, pokemon: winner, other: loser, hp: winner hp, turn: attacks made
+NAME_KIND = 5       # Chunk of the name with the given key (see NAME)
+REWIND = 6          # turn: attacks made after going back (later attacks of the battle are undone)
+
+
+def key(name):
+    """
+    Function that gets the key of a species or move name (stable over processes and files).
+
+    :param name: Species or move name
+    :return: 32-bit key
+    """
+    return zlib.crc32(name.encode())
+
+
+class battle_log:
+    """Append-only binary log of battles with fixed-size records, written in bulk."""
+    def __init__(self, path, buffer_size=256, clock=None):
+        """
+        Creates a battle log appending to a file. The file is opened (and created if needed)
+        when the first records are written, so a session without battles never touches it.
+
+        :param path: Log file path
+        :param buffer_size: Records kept in memory before they are written
+        :param clock: Function returning the time in seconds (time.time if None)
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.clock = clock if clock is not None else time.time
+        self.buffer = bytearray()       # Records not written yet
+        self.names = set()              # Keys whose names were logged by this log
+        self.battle = 0                 # Id of the current battle
+        self.turn = 0                   # Attacks made in the current battle
+        self.file = None                # Log file (opened on the first flush)
+
+    def record(self, kind, side=0, hp=0, pokemon=0, other=0, damage=0):
+        """
+        Function that adds a record of the current battle to the buffer.
+
+        :param kind: Record kind
+        :param side: Side (0 player, 1 enemy)
+        :param hp: HP field
+        :param pokemon: Pokemon key
+        :param other: Key of the other Pokemon or move
+        :param damage: Damage field
+        """
+        self.buffer += RECORD.pack(kind, side, max(0, min(hp, 0xFFFF)), self.battle, pokemon, other,
+                                   max(0, min(damage, 0xFFFF)), min(self.turn, 0xFFFF), int(self.clock()))
+        if len(self.buffer) >= self.buffer_size * RECORD.size:
+            self.flush()
+
+    def name(self, name):
+        """
+        Function that logs a name the first time it is used.
+
+        :param name: Species or move name
+        :return: Key of the name
+        """
+        name_key = key(name)
+        if name_key not in self.names:
+            self.names.add(name_key)
+            encoded = name.encode()
+            for chunk in range(0, max(len(encoded), 1), 16):
+                self.buffer += NAME.pack(NAME_KIND, chunk // 16, name_key, encoded[chunk:chunk + 16])
+        return name_key
+
+    def start(self, Player, Enemy, turn=0):
+        """
+        Function that logs the start of a battle.
+
+        :param Player: Playable Pokemon
+        :param Enemy: Enemy (AI) Pokemon
+        :param turn: Attacks made already (when continuing a saved battle)
+        """
+        self.battle = int.from_bytes(os.urandom(4), 'little')     # Unique over processes appending to the log
+        self.turn = turn
+        self.record(START, 0, Player.hp, self.name(Player.name), self.name(Enemy.name), Enemy.hp)
+
+    def attack(self, side, attacker, move, damage, defender_hp):
+        """
+        Function that logs an attack.
+
+        :param side: Attacking side (0 player, 1 enemy)
+        :param attacker: Attacking Pokemon
+        :param move: Move name
+        :param damage: Damage done
+        :param defender_hp: HP left of the attacked Pokemon
+        """
+        self.turn += 1
+        self.record(ATTACK, side, defender_hp, self.name(attacker.name), self.name(move), damage)
+
+    def swap(self, old, new):
+        """
+        Function that logs a change of the player's Pokemon.
+
+        :param old: Pokemon taken out
+        :param new: Pokemon sent in
+        """
+        self.record(SWAP, 0, new.hp, self.name(old.name), self.name(new.name))
+
+    def rewind(self, turn):
+        """
+        Function that logs going back in the battle (undo), so the attacks
+        made after it do not count.
+
+        :param turn: Attacks made at the state gone back to
+        """
+        self.turn = turn
+        self.record(REWIND)
+
+    def end(self, winner, loser, side):
+        """
+        Function that logs the end of a battle.
+
+        :param winner: Winning Pokemon
+        :param loser: Losing Pokemon
+        :param side: Winning side (0 player, 1 enemy)
+        """
+        self.record(END, side, winner.hp, self.name(winner.name), self.name(loser.name))
+
+    def flush(self):
+        """Function that writes the buffered records in one write."""
+        if self.buffer:
+            if self.file is None:
+                self.file = open(self.path, 'ab')
+                if self.file.tell() == 0:
+                    self.buffer[:0] = HEADER.pack(HEADER_KIND, MAGIC, VERSION)
+            self.file.write(self.buffer)
+            self.file.flush()
+            self.buffer = bytearray()
+
+    def close(self):
+        """Function that writes the buffered records and closes the log."""
+        self.flush()
+        if self.file is not None:
+            self.file.close()
+
+
+class aggregate:
+    """Win rates per species and per move, built in one streaming pass over battle logs."""
+    def __init__(self):
+        """Creates an empty aggregate."""
+        self.names = {}         # Key -> encoded name
+        self.species = {}       # Species key -> [battles, wins]
+        self.moves = {}         # Move key -> [battles, wins, uses, damage]
+        self.open = {}          # Battle id -> list of (turn, side, move key, damage) of battles without an END record yet
+        self.records = 0        # Records scanned
+
+    def scan(self, path):
+        """
+        Function that adds a log file. The file is memory-mapped and read record by record,
+        only battles that have not ended yet are kept in memory.
+        A partial record at the end (e.g. from a crash) is ignored.
+
+        :param path: Log file path
+        """
+        size = os.path.getsize(path)
+        if size < RECORD.size:
+            return
+        with open(path, 'rb') as log_file:
+            data = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            kind, magic, version = HEADER.unpack_from(data, 0)
+            if kind != HEADER_KIND or magic != MAGIC:
+                raise ValueError(f"'{path}' is not a battle log")
+            if version != VERSION:
+                raise ValueError(f"Unsupported battle log version {version} in '{path}'")
+            with memoryview(data) as whole, whole[RECORD.size:size - size % RECORD.size] as view:
+                self.scan_records(view)
+        finally:
+            data.close()
+
+    def scan_records(self, view):
+        """
+        Function that adds the records of a log.
+
+        :param view: Buffer of whole records
+        """
+        names, species, moves, open_battles = self.names, self.species, self.moves, self.open
+        for index, (kind, side, hp, battle, pokemon, other, damage, turn, _) in enumerate(RECORD.iter_unpack(view)):
+            if kind == ATTACK:
+                open_battles.setdefault(battle, []).append((turn, side, other, damage))
+                move = moves.setdefault(other, [0, 0, 0, 0])
+                move[2] += 1
+                move[3] += damage
+            elif kind == START:
+                open_battles[battle] = []
+            elif kind == END:
+                for name_key, won in ((pokemon, True), (other, False)):
+                    counts = species.setdefault(name_key, [0, 0])
+                    counts[0] += 1
+                    counts[1] += won
+                used = {(used_side, move_key) for _, used_side, move_key, _ in open_battles.pop(battle, ())}
+                for used_side, move_key in used:
+                    counts = moves[move_key]
+                    counts[0] += 1
+                    counts[1] += used_side == side
+            elif kind == REWIND:
+                # Undone attacks are taken back out of the move counts
+                attacks = open_battles.get(battle, [])
+                while attacks and attacks[-1][0] > turn:
+                    _, _, move_key, undone = attacks.pop()
+                    moves[move_key][2] -= 1
+                    moves[move_key][3] -= undone
+            elif kind == NAME_KIND:
+                # Chunks of a name are written one after the other (in a single write)
+                _, chunk, name_key, text = NAME.unpack_from(view, index * RECORD.size)
+                text = text.rstrip(b'\0')
+                names[name_key] = names.get(name_key, b'') + text if chunk else text
+        self.records += len(view) // RECORD.size
+
+    def label(self, name_key):
+        """
+        Function that gets the name of a key.
+
+        :param name_key: Species or move key
+        :return: Name (hex key if the name was never logged)
+        """
+        if name_key not in self.names:
+            return f"{name_key:08x}"
+        return self.names[name_key].decode(errors='replace')
+
+    def results(self):
+        """
+        Function that gets the win rates.
+
+        :return: Dictionary with 'species' and 'moves' (name -> counts and win rate)
+        """
+        return {
+            'species': {self.label(name_key): {'battles': battles, 'wins': wins, 'win_rate': wins / battles}
+                        for name_key, (battles, wins) in self.species.items()},
+            'moves': {self.label(name_key): {'battles': battles, 'wins': wins, 'uses': uses,
+                                             'damage': damage, 'win_rate': wins / battles if battles else 0.0}
+                      for name_key, (battles, wins, uses, damage) in self.moves.items()},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute win rates per species and move from battle logs.")
+    parser.add_argument('logs', nargs='+', help="battle log files")
+    parser.add_argument('--output', help="write the results as json to this file")
+    args = parser.parse_args()
+
+    totals = aggregate()
+    for path in args.logs:
+        totals.scan(path)
+    results = totals.results()
+
+    print(f"{totals.records:,} records, {sum(c['battles'] for c in results['species'].values()) // 2:,} battles")
+    for section in ('species', 'moves'):
+        print(f"\n{section.capitalize():<16}{'battles':>10}{'win rate':>10}")
+        for name, counts in sorted(results[section].items(), key=lambda item: -item[1]['win_rate']):
+            print(f"{name:<16}{counts['battles']:>10,}{counts['win_rate']:>10.1%}")
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=4)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,344 @@
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import dialogbox as dialog_module
+import menu
+from assets import compile_pack
+from animation import scheduler, battle_scene, hit
+from console import console, null_sink
+from dialogbox import dialogbox
+from framebuffer import framebuffer
+from pokemon import player, enemy
+from screen import screen
+from sprite import sprite, sprite_registry
+
+BASELINE = 'benchmark_baseline.json'
+SPRITES = ['bulbasaur', 'charmander', 'gengar', 'pikachu', 'squirtle']
+SLOW_PTY = 20000            # Bytes per second of the simulated slow terminal
+TIMED = ('startup',)        # Cases also reported in milliseconds per operation
+
+
+@contextlib.contextmanager
+def scripted(inputs, sink, depth=24):
+    """
+    Context that gives all menus scripted input and sends all output to a sink.
+
+    :param inputs: Iterable of input lines
+    :param sink: Stream that receives printed and drawn output
+    :param depth: Color depth of the output (24, 256 or 16)
+    """
+    real_console = menu.menu.terminal
+    real_display = menu.menu.display
+    real_lines = os.environ.get('LINES')
+    menu.menu.use_console(console(inputs, sink))
+    menu.menu.display.depth = depth
+    os.environ['LINES'] = '1000'    # Every frame fits, so frames are diffed
+    try:
+        with contextlib.redirect_stdout(sink):
+            yield
+    finally:
+        menu.menu.terminal = real_console
+        menu.menu.display = real_display
+        if real_lines is None:
+            del os.environ['LINES']
+        else:
+            os.environ['LINES'] = real_lines
+
+
+def load_stats():
+    """
+    Function that loads the bundled Pokemon stats.
+
+    :return: Pokemon stats (name -> stats)
+    """
+    with open('pokemon.json') as pokemon_data:
+        return json.load(pokemon_data)
+
+
+def battle_case(depth=24):
+    """
+    Function that creates the scripted battle case. The player always picks the
+    first move and the enemy uses a seeded random generator.
+
+    :param depth: Color depth of the output (24, 256 or 16)
+
+    :return: Function running one battle and returning (frames, bytes written)
+    """
+    stats = load_stats()
+    player_sprite = sprite('charmander')
+    enemy_sprite = sprite('gengar')
+
+    def run():
+        random.seed(0)
+        sink = null_sink()
+        Player = player('Charmander', stats['Charmander'], player_sprite)
+        Enemy = enemy('Gengar', stats['Gengar'], enemy_sprite)
+        fight = menu.FightMenu()
+        with scripted(iter(lambda: '0', None), sink, depth):
+            while not (Player.hp == 0 or Enemy.hp == 0):
+                fight.battle(Player, Enemy)
+            frames = menu.menu.display.frames
+        return frames, sink.bytes
+    return run
+
+
+class slow_pty(null_sink):
+    """Null sink that takes as long to write as a terminal with a limited bandwidth."""
+    def __init__(self, bandwidth=SLOW_PTY):
+        """
+        Creates a slow terminal.
+
+        :param bandwidth: Bytes written per second
+        """
+        super().__init__()
+        self.bandwidth = bandwidth
+
+    def write(self, text):
+        """
+        Function that discards text after the time it takes to send it.
+
+        :param text: Text to discard
+        :return: Number of characters written
+        """
+        written = super().write(text)
+        time.sleep(len(text.encode()) / self.bandwidth)
+        return written
+
+
+def animation_case():
+    """
+    Function that creates the slow terminal animation case: an attack animation
+    drawn at 30 fps on a terminal that can not keep up.
+
+    :return: Function playing the animation once and returning the sustained frame rate
+    """
+    stats = load_stats()
+    Player = player('Charmander', stats['Charmander'], sprite('charmander'))
+    Enemy = enemy('Gengar', stats['Gengar'], sprite('gengar'))
+    scene = battle_scene(Player, Enemy)
+    moving = hit('right', Enemy.hp, 0)
+
+    def run():
+        display = screen(slow_pty(), lines=1000)
+        display.draw_frame(scene.frame(scene.start()))
+        animator = scheduler()
+        start = time.perf_counter()
+        animator.play(moving.duration, lambda progress: moving.render(scene, progress), display.draw_frame)
+        elapsed = time.perf_counter() - start
+        return {'fps': round(animator.drawn / elapsed, 1), 'dropped': animator.dropped,
+                'late_ms': round(max(0, elapsed - moving.duration) * 1000, 1)}
+    return run
+
+
+def startup_case(cleanup):
+    """
+    Function that creates the cold start case: a new interpreter runs main.py with the
+    default options until it draws the title screen (the screen writes a frame at once),
+    then it is stopped. Loading the roster in the background after that is not measured.
+
+    :param cleanup: contextlib.ExitStack that removes the battle log folder after measuring
+    :return: Function running one cold start
+    """
+    # Default command line, only the battle log goes to a temporary file instead of battles.log
+    log = os.path.join(cleanup.enter_context(tempfile.TemporaryDirectory()), 'battles.log')
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'), '--log', log]
+    environment = dict(os.environ, LINES='100')
+
+    def run():
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=environment)
+        try:
+            if not process.stdout.read(1):
+                raise RuntimeError(f"main.py exited with code {process.wait()} before drawing the title screen")
+        finally:
+            process.kill()
+            process.communicate()
+    return run
+
+
+def packed_load_case(cleanup):
+    """
+    Function that creates the sprite pack load case: a new registry opens a freshly
+    compiled pack and loads the sprites from it.
+
+    :param cleanup: contextlib.ExitStack that removes the pack after measuring
+    :return: Function loading the sprites from the pack
+    """
+    pack = os.path.join(cleanup.enter_context(tempfile.TemporaryDirectory()), 'sprites.pack')
+    compile_pack(path=pack)
+
+    def run():
+        registry = sprite_registry(pack=pack)
+        return [registry.get(name) for name in SPRITES]
+    return run
+
+
+def calibration_case():
+    """
+    Function that creates the calibration case: fixed pure Python work (string formatting,
+    dictionary updates and joins like the renderers do) that does not depend on the game code.
+    It runs right before every case and speeds are compared relative to it, so a baseline
+    saved on one machine holds on another (and on a busy machine).
+
+    :return: Function running the fixed work once
+    """
+    def run():
+        cells = {}
+        for ind in range(2000):
+            cells[ind % 500] = f'\x1b[38;2;{ind % 256};{ind // 256};0m\u2580'
+        return ''.join(cells.values())
+    return run
+
+
+def cases(cleanup):
+    """
+    Function that creates the benchmark cases.
+
+    :param cleanup: contextlib.ExitStack that removes the cases' temporary files after measuring
+    :return: Dictionary of case name -> function running one operation
+    """
+    stats = load_stats()
+    loaded = [sprite(name) for name in SPRITES]
+    text_lines = [line for item in loaded for line in item.lines]
+    charmander = player('Charmander', stats['Charmander'], sprite('charmander'))
+    gengar = enemy('Gengar', stats['Gengar'], sprite('gengar'))
+    dialog = dialogbox(border=2)
+    attack_menu = ["0 - Scratch     1 - Slash", "2 - Ember     3 - Flamethrower", "4 - Change Pokemon"]
+
+    return {
+        'sprite_load': lambda: [sprite(name) for name in SPRITES],
+        'sprite_load_packed': packed_load_case(cleanup),
+        'sprite_parse': lambda: framebuffer.from_lines(text_lines),
+        'sprite_render': lambda: [sprite(buffer=item.buffer.flip()).text for item in loaded],
+        'sprite_flip': lambda: [item.buffer.flip() for item in loaded],
+        'sprite_join': lambda: loaded[1].join(loaded[2], 10),
+        'get_sprite': lambda: charmander.get_sprite(moves=True, spacing=4).text,
+        'render_in_battle': lambda: charmander.render_in_battle(gengar).text,
+        'dialogbox_render': lambda: dialog_module.render.__wrapped__(
+            tuple(attack_menu), dialog.colors, dialog.border, 7, True),
+        'dialogbox_cached': lambda: (dialog(attack_menu), dialog.center(52)),
+        'battle': battle_case(),
+        'battle_256_colors': battle_case(256),
+        'battle_16_colors': battle_case(16),
+        'animation_slow_pty': animation_case(),
+        'startup': startup_case(cleanup),
+    }
+
+
+def measure(function, min_time=0.2, repeats=3):
+    """
+    Function that measures the speed and memory use of an operation.
+
+    :param function: Operation to measure
+    :param min_time: Minimum time of one timing run in seconds
+    :param repeats: Timing runs (the fastest counts)
+    :return: Dictionary of results
+    """
+    result = function()     # Warm up caches
+
+    best = 0
+    for _ in range(repeats):
+        count = 0
+        start = time.perf_counter()
+        while True:
+            function()
+            count += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, count / elapsed)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    function()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    measured = {'ops_per_sec': round(best, 1), 'peak_alloc_bytes': peak}
+    if isinstance(result, tuple) and len(result) == 2 and all(isinstance(x, int) for x in result):
+        frames, written = result
+        measured['frames'] = frames
+        measured['bytes_per_frame'] = round(written / frames, 1)
+    if isinstance(result, dict):
+        measured.update(result)
+    return measured
+
+
+def compare(results, baseline, tolerance):
+    """
+    Function that compares results with a baseline. Speeds are compared relative to the
+    calibration case (see calibration_case), other metrics as they are.
+
+    :param results: Measured results (case -> metrics)
+    :param baseline: Baseline results (case -> metrics)
+    :param tolerance: Allowed relative slowdown or growth (0.5 = 50%)
+    :return: List of regression messages
+    """
+    regressions = []
+    for case, metrics in results.items():
+        base = baseline.get(case)
+        if base is None:
+            continue
+        if metrics['relative_speed'] < base.get('relative_speed', 0) * (1 - tolerance):
+            regressions.append(f"{case}: {metrics['relative_speed']}x the calibration speed < baseline {base['relative_speed']}x")
+        if metrics['peak_alloc_bytes'] > base['peak_alloc_bytes'] * (1 + tolerance):
+            regressions.append(f"{case}: peak allocation {metrics['peak_alloc_bytes']} B > baseline {base['peak_alloc_bytes']}")
+        # Output size is deterministic, so any growth is a regression
+        if 'bytes_per_frame' in base and metrics.get('bytes_per_frame', 0) > base['bytes_per_frame']:
+            regressions.append(f"{case}: {metrics['bytes_per_frame']} bytes/frame > baseline {base['bytes_per_frame']}")
+        # The frame rate on the simulated terminal depends on its bandwidth, not on the machine
+        if 'fps' in base and metrics.get('fps', 0) < base['fps'] * (1 - tolerance):
+            regressions.append(f"{case}: {metrics['fps']} fps < baseline {base['fps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sprite, dialogbox, menu and battle hot paths.")
+    parser.add_argument('cases', nargs='*', help="cases to run (default: all)")
+    parser.add_argument('--baseline', default=BASELINE, help="baseline json file")
+    parser.add_argument('--save', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="allowed relative slowdown (default 0.5)")
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds per timing run")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as cleanup:
+        all_cases = cases(cleanup)
+        selected = args.cases or list(all_cases)
+        calibration = calibration_case()
+        results = {}
+        for case in selected:
+            speed = measure(calibration, args.min_time)['ops_per_sec']
+            results[case] = measure(all_cases[case], args.min_time)
+            metrics = results[case]
+            metrics['relative_speed'] = round(metrics['ops_per_sec'] / speed, 4)
+            extra = f"  {metrics['bytes_per_frame']:>9} B/frame" if 'bytes_per_frame' in metrics else ""
+            if 'fps' in metrics:
+                extra += f"  {metrics['fps']:>6} fps  {metrics['dropped']:>3} dropped  {metrics['late_ms']:>6} ms late"
+            if case in TIMED:
+                extra += f"  {1000 / metrics['ops_per_sec']:>9.1f} ms"
+            print(f"{case:<19}{metrics['ops_per_sec']:>12,.1f} ops/s{metrics['relative_speed']:>10.4f}x{metrics['peak_alloc_bytes']:>12,} B peak{extra}")
+
+    if args.save:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import sys
+import profiler
+
+SESSION_VERSION = 1
+
+
+class console:
+    """Input source and output sink used by the menus (the terminal by default)."""
+    def __init__(self, source=None, sink=None, echo=False):
+        """
+        Creates a console.
+
+        :param source: Iterable of input lines (input() if None)
+        :param sink: Writable text stream (sys.stdout if None)
+        :param echo: bool for writing input lines from the source to the output (like a terminal)
+        """
+        self.source = iter(source) if source is not None else None
+        self.sink = sink
+        self.echo = echo
+
+    def stream(self):
+        """
+        Function that gets the output stream.
+
+        :return: Writable text stream
+        """
+        return self.sink if self.sink is not None else sys.stdout
+
+    def read(self, prompt=""):
+        """
+        Function that asks for one line of input.
+
+        :param prompt: Text to show when asking for input
+        :return: Input line (without newline)
+        """
+        with profiler.span('input-wait') as timed:
+            if self.source is None:
+                line = input(prompt)
+            else:
+                self.write(prompt)
+                try:
+                    line = next(self.source)
+                except StopIteration:
+                    raise EOFError("Input source is exhausted") from None
+                if self.echo:
+                    self.write(line + "\n")
+            timed.size = len(line)
+        return line
+
+    def run(self, steps):
+        """
+        Function that runs a step-wise menu interaction (see menu.select), reading
+        an input line for every prompt it yields.
+
+        :param steps: Generator yielding prompts and receiving input lines
+        :return: Result of the interaction
+        """
+        try:
+            prompt = next(steps)
+            while True:
+                if not isinstance(prompt, str):
+                    raise TypeError("Waiting on other sessions needs an asynchronous driver (see server.py)")
+                prompt = steps.send(self.read(prompt))
+        except StopIteration as stop:
+            return stop.value
+
+    def write(self, text):
+        """
+        Function that writes text to the output.
+
+        :param text: Text to write
+        """
+        with profiler.span('write') as timed:
+            self.stream().write(text)
+            if timed:
+                timed.size = len(text.encode())
+
+    def flush(self):
+        """Function that flushes the output."""
+        self.stream().flush()
+
+    def print(self, text=""):
+        """
+        Function that writes a line of text to the output.
+
+        :param text: Text to write
+        """
+        self.write(f"{text}\n")
+
+
+class null_sink:
+    """Write-only text stream that counts and discards what is written."""
+    def __init__(self):
+        """Creates a null sink."""
+        self.bytes = 0      # Bytes written
+
+    def write(self, text):
+        """
+        Function that discards text.
+
+        :param text: Text to discard
+        :return: Number of characters written
+        """
+        self.bytes += len(text.encode())
+        return len(text)
+
+    def flush(self):
+        """Function that does nothing (nothing is buffered)."""
+
+
+class recorder(console):
+    """Console that records every input line, so a session can be replayed."""
+    def __init__(self, source=None, sink=None, seed=0):
+        """
+        Creates a recording console.
+
+        :param source: Iterable of input lines (input() if None)
+        :param sink: Writable text stream (sys.stdout if None)
+        :param seed: Seed of the random generator used in the session
+        """
+        super().__init__(source, sink, echo=source is not None)
+        self.seed = seed
+        self.inputs = []        # Input lines read so far
+
+    def read(self, prompt=""):
+        """
+        Function that asks for one line of input and records it.
+
+        :param prompt: Text to show when asking for input
+        :return: Input line (without newline)
+        """
+        line = super().read(prompt)
+        self.inputs.append(line)
+        return line
+
+    def save(self, path):
+        """
+        Function that saves the recorded session.
+
+        :param path: Session file path
+        """
+        save_session(path, self.seed, self.inputs)
+
+
+def save_session(path, seed, inputs):
+    """
+    Function that saves a session file (json with the random seed and every input line).
+
+    :param path: Session file path
+    :param seed: Seed of the random generator used in the session
+    :param inputs: Input lines in order
+    """
+    import json     # Sessions are only saved and loaded with --record and replay.py
+    with open(path, 'w') as session_file:
+        json.dump({'version': SESSION_VERSION, 'seed': seed, 'inputs': inputs}, session_file)
+
+
+def load_session(path):
+    """
+    Function that loads a session file.
+
+    :param path: Session file path
+    :return: (seed, input lines)
+    """
+    import json
+    with open(path) as session_file:
+        session = json.load(session_file)
+    if session.get('version') != SESSION_VERSION:
+        raise ValueError(f"Unsupported session version in '{path}'")
+    return session['seed'], session['inputs']
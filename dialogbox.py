@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 class dialogbox:
     """Class for creating and displaying an ANSI escape code based dialogbox"""
     def __init__(self, edge_color = [0,0,0], bg_color = [254,254,254], text_color = [0,0,0], border=0, spacing=0, text_centered=True):
@@ -19,6 +21,8 @@ class dialogbox:
         self.border = border                        # Space from edge to text
         self.spacing = spacing                      # Spaces before dialogbox
         self.lines_centered = text_centered
+        # Colors as strings to add to ANSI codes (edge, bg, shadow, text)
+        self.colors = tuple(";".join(map(str,col)) for col in (self.edge_col, self.bg_col, self.shdw_col, self.lines_col))
 
     def center(self, width):
         """
@@ -44,48 +48,73 @@ class dialogbox:
         """
         Function to position text in dialogbox based on centering bool.
         """
-        positioned_lines = self.lines.copy()
-        max_length = len(max(positioned_lines,key=len))   # Longest line in lines
-
-        for i,t in enumerate(positioned_lines):
-            length_diff = max_length-len(t)               # Length difference from longest line
-            # Center
-            if self.lines_centered:
-                text_spacing = self.border + int((length_diff+(max_length % 2))/2)
-                positioned_lines[i] = (' '*(text_spacing)) + t + (' '*((text_spacing) + len(t) % 2))
-            # Don't center
-            else:
-                text_spacing = self.border + length_diff
-                positioned_lines[i] = ' ' * self.border + t + ' '*text_spacing
-
-        return positioned_lines
+        return list(position_text(tuple(self.lines), self.border, self.lines_centered))
 
     def render(self):
-        """Function to render dialogbox in ANSI format."""
-        space = ' '                                 # Space
-        new_line = '\n'+self.spacing*' '            # New line + spaces before dialogbox
-
-        edge = ";".join(map(str,self.edge_col))     # Edge color as string to add to ANSI code
-        bg = ";".join(map(str,self.bg_col))         # Bg color as string to add to ANSI code
-        shdw = ";".join(map(str,self.shdw_col))     # Shadow color as string to add to ANSI code
-        txt = ";".join(map(str,self.lines_col))     # Text color as string to add to ANSI code
-
-        positioned_lines = self.position_text()
-        max_length = len(max(positioned_lines,key=len))    # Longest string
-        self.width = max_length + 6      # 2 edges of length 3
-        # Textbox in ANSI format
-        self.ansi =  (
-            f'{self.spacing*space} \x1b[38;2;{edge}m▄\x1b[38;2;{shdw};48;2;{edge}m▄\x1b[38;2;{edge};48;2;{bg}m{"▀"*(max_length-4)}\x1b[38;2;{shdw};48;2;{edge}m▄\x1b[m\x1b[38;2;{edge}m▄ \x1b[m{new_line}' +
-            f'\x1b[48;2;{edge}m \x1b[38;2;{bg};48;2;{shdw}m▄\x1b[48;2;{bg}m{space*(max_length-2)}\x1b[38;2;{bg};48;2;{shdw}m▄\x1b[m\x1b[48;2;{edge}m \x1b[m{new_line}' +
-            f'\x1b[48;2;{edge}m \x1b[48;2;{bg}m{space*(max_length)}\x1b[m\x1b[48;2;{edge}m \x1b[m{new_line}'*int(self.border/2) +
-            "".join(f'\x1b[48;2;{edge}m \x1b[48;2;{bg}m\x1b[38;2;{txt}m{t}\x1b[m\x1b[48;2;{edge}m \x1b[m{new_line}' for t in positioned_lines) +
-            f'\x1b[48;2;{edge}m \x1b[48;2;{bg}m{space*(max_length)}\x1b[m\x1b[48;2;{edge}m \x1b[m{new_line}'*(int(self.border/2)) +
-            f'\x1b[48;2;{edge}m \x1b[38;2;{bg};48;2;{shdw}m▀\x1b[48;2;{bg}m{space*(max_length-2)}\x1b[m\x1b[38;2;{bg};48;2;{shdw}m▀\x1b[48;2;{edge}m \x1b[m{new_line}' +
-            f' \x1b[38;2;{edge}m▀\x1b[38;2;{edge};48;2;{shdw}m▄\x1b[38;2;{edge};48;2;{bg}m{"▄"*(max_length-4)}\x1b[m\x1b[38;2;{edge};48;2;{shdw}m▄\x1b[m\x1b[38;2;{edge}m▀\x1b[m'
-        )
-    
+        """Function to render dialogbox in ANSI format (cached for repeated content and geometry)."""
+        self.ansi, self.width = render(tuple(self.lines), self.colors, self.border, self.spacing, self.lines_centered)
+
     def show(self):
         """Function to print ANSI dialogbox."""
         if self.lines != None:
             self.render()
-            print(self.ansi)
\ No newline at end of file
+            print(self.ansi)
+
+
+def position_text(lines, border, centered):
+    """
+    Function to position text in dialogbox based on centering bool.
+
+    :param lines: Lines of text
+    :param border: Space from edge to text
+    :param centered: bool for centering text
+    :return: Positioned lines
+    """
+    positioned_lines = list(lines)
+    max_length = len(max(positioned_lines,key=len))   # Longest line in lines
+
+    for i,t in enumerate(positioned_lines):
+        length_diff = max_length-len(t)               # Length difference from longest line
+        # Center
+        if centered:
+            text_spacing = border + int((length_diff+(max_length % 2))/2)
+            positioned_lines[i] = (' '*(text_spacing)) + t + (' '*((text_spacing) + len(t) % 2))
+        # Don't center
+        else:
+            text_spacing = border + length_diff
+            positioned_lines[i] = ' ' * border + t + ' '*text_spacing
+
+    return positioned_lines
+
+
+@lru_cache(maxsize=256)
+def render(lines, colors, border, spacing, centered):
+    """
+    Function to render a dialogbox in ANSI format.
+    Results are kept in a bounded LRU cache, so repeated prompts render at no cost.
+
+    :param lines: Lines of text (tuple)
+    :param colors: Edge, background, shadow and text colors as ANSI code strings
+    :param border: Space from edge to text
+    :param spacing: Spaces before dialogbox
+    :param centered: bool for centering text
+    :return: (ANSI dialogbox, dialogbox width)
+    """
+    space = ' '                                 # Space
+    new_line = '\n'+spacing*' '                 # New line + spaces before dialogbox
+    edge, bg, shdw, txt = colors
+
+    positioned_lines = position_text(lines, border, centered)
+    max_length = len(max(positioned_lines,key=len))    # Longest string
+    width = max_length + 6      # 2 edges of length 3
+    # Textbox in ANSI format
+    ansi =  (
+        f'{spacing*space} \x1b[38;2;{edge}m▄\x1b[38;2;{shdw};48;2;{edge}m▄\x1b[38;2;{edge};48;2;{bg}m{"▀"*(max_length-4)}\x1b[38;2;{shdw};48;2;{edge}m▄\x1b[m\x1b[38;2;{edge}m▄ \x1b[m{new_line}' +
+        f'\x1b[48;2;{edge}m \x1b[38;2;{bg};48;2;{shdw}m▄\x1b[48;2;{bg}m{space*(max_length-2)}\x1b[38;2;{bg};48;2;{shdw}m▄\x1b[m\x1b[48;2;{edge}m \x1b[m{new_line}' +
+        f'\x1b[48;2;{edge}m \x1b[48;2;{bg}m{space*(max_length)}\x1b[m\x1b[48;2;{edge}m \x1b[m{new_line}'*int(border/2) +
+        "".join(f'\x1b[48;2;{edge}m \x1b[48;2;{bg}m\x1b[38;2;{txt}m{t}\x1b[m\x1b[48;2;{edge}m \x1b[m{new_line}' for t in positioned_lines) +
+        f'\x1b[48;2;{edge}m \x1b[48;2;{bg}m{space*(max_length)}\x1b[m\x1b[48;2;{edge}m \x1b[m{new_line}'*(int(border/2)) +
+        f'\x1b[48;2;{edge}m \x1b[38;2;{bg};48;2;{shdw}m▀\x1b[48;2;{bg}m{space*(max_length-2)}\x1b[m\x1b[38;2;{bg};48;2;{shdw}m▀\x1b[48;2;{edge}m \x1b[m{new_line}' +
+        f' \x1b[38;2;{edge}m▀\x1b[38;2;{edge};48;2;{shdw}m▄\x1b[38;2;{edge};48;2;{bg}m{"▄"*(max_length-4)}\x1b[m\x1b[38;2;{edge};48;2;{shdw}m▄\x1b[m\x1b[38;2;{edge}m▀\x1b[m'
+    )
+    return ansi, width
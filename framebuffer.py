@@ -0,0 +1,205 @@
+from array import array
+import ansi
+
+DEFAULT = 1 << 24       # Packed color for the terminal default (outside the 24-bit RGB range)
+SPACE = ord(' ')
+
+
+def to_packed(color):
+    """
+    Function that converts a cell color to a packed buffer color.
+
+    :param color: Packed RGB color, None for the terminal default
+    :return: Packed buffer color
+    """
+    return DEFAULT if color is None else color
+
+
+class framebuffer:
+    """Immutable grid of cells stored as glyph codes and packed RGB colors."""
+    __slots__ = ('width', 'height', 'glyphs', 'fg', 'bg', '_lines')
+
+    def __init__(self, width, height, glyphs=None, fg=None, bg=None):
+        """
+        Creates a framebuffer (filled with empty cells if no buffers are given).
+
+        :param width: Width in cells
+        :param height: Height in cells
+        :param glyphs: array('I') of unicode code points, row by row
+        :param fg: array('I') of packed foreground colors
+        :param bg: array('I') of packed background colors
+        """
+        size = width * height
+        self.width = width
+        self.height = height
+        self.glyphs = glyphs if glyphs is not None else array('I', [SPACE]) * size
+        self.fg = fg if fg is not None else array('I', [DEFAULT]) * size
+        self.bg = bg if bg is not None else array('I', [DEFAULT]) * size
+        self._lines = None      # Rendered lines (created when first needed)
+
+    @classmethod
+    def from_lines(cls, lines):
+        """
+        Function that creates a framebuffer from lines of ANSI text.
+        Shorter lines are padded with empty cells.
+
+        :param lines: Lines of text with SGR escape sequences
+        :return: framebuffer
+        """
+        rows = [ansi.parse(line) for line in lines]
+        width = max(map(len, rows), default=0)
+        glyphs, fg, bg = array('I'), array('I'), array('I')
+        for row in rows:
+            row = row + [ansi.BLANK] * (width - len(row))
+            glyphs.extend(ord(glyph) for _, _, glyph in row)
+            fg.extend(to_packed(color) for color, _, _ in row)
+            bg.extend(to_packed(color) for _, color, _ in row)
+        return cls(width, len(rows), glyphs, fg, bg)
+
+    def row_slice(self, y):
+        """
+        Function that gets the buffer slice of a row.
+
+        :param y: Row index
+        :return: slice of the row in the buffers
+        """
+        return slice(y * self.width, (y + 1) * self.width)
+
+    def cells(self, y):
+        """
+        Function that gets the cells of a row.
+
+        :param y: Row index
+        :return: List of (fg, bg, glyph) cells (None for default colors)
+        """
+        row = self.row_slice(y)
+        return [(None if fg == DEFAULT else fg, None if bg == DEFAULT else bg, chr(glyph))
+                for fg, bg, glyph in zip(self.fg[row], self.bg[row], self.glyphs[row])]
+
+    @property
+    def lines(self):
+        """Lines of ANSI text (rendered once, on first use)."""
+        if self._lines is None:
+            self._lines = tuple(ansi.emit(self.cells(y)) for y in range(self.height))
+        return self._lines
+
+    @property
+    def text(self):
+        """Framebuffer as text (one line per row, ending with a newline)."""
+        return "\n".join(self.lines) + "\n"
+
+    def map_rows(self, width, height, rows):
+        """
+        Function that builds a new framebuffer out of row slices of this one.
+
+        :param width: Width of the new framebuffer
+        :param height: Height of the new framebuffer
+        :param rows: Function that maps a buffer to a list of row pieces
+        :return: framebuffer
+        """
+        buffers = []
+        for buffer in (self.glyphs, self.fg, self.bg):
+            new = array('I')
+            for piece in rows(buffer):
+                new.extend(piece)
+            buffers.append(new)
+        return framebuffer(width, height, *buffers)
+
+    def flip(self):
+        """
+        Function that flips the framebuffer horizontally.
+
+        :return: Flipped framebuffer
+        """
+        w = self.width
+        return self.map_rows(w, self.height,
+            lambda buffer: [buffer[y*w:(y+1)*w][::-1] for y in range(self.height)])
+
+    def pad(self, left=0, right=0, top=0):
+        """
+        Function that adds empty cells around the framebuffer.
+
+        :param left: Empty columns before every row
+        :param right: Empty columns after every row
+        :param top: Empty rows above the framebuffer
+        :return: Padded framebuffer
+        """
+        if left == right == top == 0:
+            return self
+        w = self.width
+        new_width = w + left + right
+
+        def rows(buffer):
+            empty = array('I', [SPACE if buffer is self.glyphs else DEFAULT])
+            pieces = [empty * (new_width * top)]
+            for y in range(self.height):
+                pieces += [empty * left, buffer[y*w:(y+1)*w], empty * right]
+            return pieces
+        return self.map_rows(new_width, self.height + top, rows)
+
+    def join(self, other, spacing):
+        """
+        Function that puts another framebuffer on the right of this one.
+        The shorter framebuffer gets empty rows above it (so both stand on the same level).
+
+        :param other: framebuffer to put on the right
+        :param spacing: Empty columns in between
+        :return: Joined framebuffer
+        """
+        height = max(self.height, other.height)
+        left = self.pad(right=spacing, top=height - self.height)
+        right = other.pad(top=height - other.height)
+        lw, rw = left.width, right.width
+        buffers = []
+        for a, b in zip((left.glyphs, left.fg, left.bg), (right.glyphs, right.fg, right.bg)):
+            new = array('I')
+            for y in range(height):
+                new.extend(a[y*lw:(y+1)*lw])
+                new.extend(b[y*rw:(y+1)*rw])
+            buffers.append(new)
+        return framebuffer(lw + rw, height, *buffers)
+
+    def overlay(self, other, x=0, y=0):
+        """
+        Function that draws another framebuffer on top of this one.
+        Parts of the other framebuffer outside of this one are cut off.
+
+        :param other: framebuffer to draw
+        :param x: Column of the left edge of the other framebuffer
+        :param y: Row of the top edge of the other framebuffer
+        :return: New framebuffer
+        """
+        glyphs, fg, bg = array('I', self.glyphs), array('I', self.fg), array('I', self.bg)
+        start, end = max(x, 0), min(x + other.width, self.width)
+        for row in range(max(y, 0), min(y + other.height, self.height)):
+            if start >= end:
+                break
+            target = slice(row * self.width + start, row * self.width + end)
+            offset = (row - y) * other.width - x
+            source = slice(offset + start, offset + end)
+            glyphs[target] = other.glyphs[source]
+            fg[target] = other.fg[source]
+            bg[target] = other.bg[source]
+        return framebuffer(self.width, self.height, glyphs, fg, bg)
+
+    def append_lines(self, lines):
+        """
+        Function that adds lines of text below the framebuffer.
+
+        :param lines: Lines of text to add
+        :return: New framebuffer (wider if a line is longer than the framebuffer)
+        """
+        return self.stack(framebuffer.from_lines(lines))
+
+    def stack(self, below):
+        """
+        Function that puts another framebuffer below this one.
+
+        :param below: framebuffer to put below
+        :return: New framebuffer (as wide as the widest of both)
+        """
+        width = max(self.width, below.width)
+        top = self.pad(right=width - self.width)
+        bottom = below.pad(right=width - below.width)
+        return framebuffer(width, top.height + bottom.height, top.glyphs + bottom.glyphs,
+                           top.fg + bottom.fg, top.bg + bottom.bg)
@@ -1,46 +1,218 @@
-import json
+import os
+import threading
 from menu import *
+from state import battle_state, timeline
+
+ROOT = os.path.dirname(os.path.abspath(__file__))       # Game folder (files are found from any working directory)
+ROSTER = os.path.join(ROOT, 'pokemon.json')
+MATCHUPS = os.path.join(ROOT, 'matchups.bin')
+SPRITE_CACHE = os.path.join(ROOT, '.sprite_cache')
+BATTLE_LOG = os.path.join(ROOT, 'battles.log')
 
 class game:
     """Pokemon game class"""
-    def __init__(self):
-        """Function to initialize the Pokemon game."""
-        with open('pokemon.json') as pokemon_data:
-            self.pokemons = json.load(pokemon_data)     # Load pokemons from json file
+    def __init__(self, sprite_cache=SPRITE_CACHE, enemy_policy=None, pokemons=None, matchups=None,
+                 terminal=None, display=None, lobby=None, log=None):
+        """
+        Function to initialize the Pokemon game.
+
+        :param sprite_cache: Folder for caching flipped sprites on disk (None to disable)
+        :param enemy_policy: Function (enemy, attackee) -> attack name for the enemy (random attacks if None)
+        :param pokemons: Pokemons to play with (roster of pokemon.json if None), can be shared between games
+        :param matchups: matchup_index of the Pokemons (opened from matchups.bin if None)
+                         Missing pokemons and matchups are loaded in the background while the title screen is shown.
+        :param terminal: console of this game's menus (the console shared by all menus if None)
+        :param display: screen of this game's menus (the screen shared by all menus if None)
+        :param lobby: Lobby for player vs player battles (see server.py, None to only play against the AI)
+        :param log: battle_log recording the battles against the AI (not recorded if None)
+        """
+        registry.cache_dir = sprite_cache
+        self._pokemons = pokemons       # Pokemons indexed from json file (loaded on demand)
+        self._matchups = matchups       # Win chances of every matchup
+        self.error = None               # Exception raised while loading in the background
+        self.loader = None
+        self.roster_loaded = threading.Event()      # Set when the background loading has the roster
+        if pokemons is not None:
+            self.roster_loaded.set()
+        if pokemons is None or matchups is None:
+            self.loader = threading.Thread(target=self.load, daemon=True)
+            self.loader.start()
+        self.enemy_policy = enemy_policy
+        self.terminal = terminal
+        self.display = display if display is not None or terminal is None else screen(terminal)
+        self.lobby = lobby
+        self.log = log
+        self.history = None             # timeline of the battle in progress (None outside battles)
+        self.resume = None              # timeline of a saved battle to continue first
+
+    def load(self):
+        """
+        Function to load the roster and then the matchup index (runs in a background thread).
+        The roster is available as soon as it is loaded, so selecting a Pokemon does not
+        wait for the matchup index (which may have to be rebuilt).
+        """
+        try:
+            # Imported here, so sqlite3 and hashlib do not delay the title screen
+            if self._pokemons is None:
+                from roster import roster
+                self._pokemons = roster(ROSTER)
+            self.roster_loaded.set()
+            if self._matchups is None:
+                from matchups import matchup_index
+                self._matchups = matchup_index.open(self._pokemons, MATCHUPS, ROSTER)
+        except Exception as error:
+            self.error = error
+        finally:
+            self.roster_loaded.set()
+
+    def wait(self):
+        """Function to wait until the background loading is done."""
+        if self.loader is not None:
+            self.loader.join()
+            self.loader = None
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def pokemons(self):
+        """Pokemons to play with (waits for the background loading of the roster only)."""
+        self.roster_loaded.wait()
+        if self._pokemons is None:
+            self.wait()     # Loading the roster failed
+        return self._pokemons
+
+    @property
+    def matchups(self):
+        """matchup_index of the Pokemons (waits for the background loading)."""
+        self.wait()
+        return self._matchups
+
+    def attach(self, new_menu):
+        """
+        Function to send the input and output of a menu through this game's console.
+
+        :param new_menu: Menu of this game
+        :return: The menu
+        """
+        if self.terminal is not None:
+            new_menu.terminal = self.terminal
+            new_menu.display = self.display
+        return new_menu
 
     def loop(self):
         """Function to run the Pokemon game"""
+        (self.terminal or menu.terminal).run(self.steps())
+
+    def steps(self):
+        """Step-wise version of loop: yields prompts and receives input lines (see menu.select)."""
+        saved, self.resume = self.resume, None
         while True:
-            # Main menu
-            main = MainMenu()
-            if main.show_and_select() == "Exit":   # Exit
-                break
+            if saved is not None:
+                # Continue the saved battle before showing the main menu
+                player_select = self.attach(SelectionMenu(self.pokemons,True))
+                winner = yield from self.battle(player_select, None, saved)
+                won, saved = None, None
             else:
-                pokemon_names = list(self.pokemons.keys())
-                sprites = [sprite(name) for name in pokemon_names] # Load sprites
-                # Select player
-                player_select = SelectionMenu(self.pokemons,sprites,True)
-                player = player_select.show_and_select()
-
-                # Select enemy
-                enemy_select = SelectionMenu(self.pokemons,sprites,False)
-                enemy = enemy_select.show_and_select()
-                
-                # Create battle
-                fight = FightMenu()
-
-                # Battle
-                while not (player.hp == 0 or enemy.hp == 0):
-                    Change_pokemon = fight.battle(player,enemy)
-                    # Change pokemon
-                    if Change_pokemon:
-                        player = player_select.swap(player)
-
-                # Game over
-                winner = max([player,enemy],key=lambda y: y.hp)
-                Game_over = GameOver(winner)
-
-                if Game_over.show_and_select() == "Exit":  # Exit
+                # Main menu
+                main = self.attach(MainMenu(pvp=self.lobby is not None))
+                action = yield from main.select()
+                if action == "Exit":   # Exit
                     break
 
-        print("Thanks for playing")
\ No newline at end of file
+                # Select player
+                player_select = self.attach(SelectionMenu(self.pokemons,True))
+                player = yield from player_select.select()
+
+                if action == "Player vs player":
+                    winner, won = yield from self.lobby.duel(self, player)
+                else:
+                    winner = yield from self.battle(player_select, player)
+                    won = None
+
+            # Game over
+            Game_over = self.attach(GameOver(winner, won))
+
+            if (yield from Game_over.select()) == "Exit":  # Exit
+                break
+
+        (self.terminal or menu.terminal).print("Thanks for playing")
+
+    def battle(self, player_select, player, saved=None):
+        """
+        Function to select an enemy and battle it (step-wise, see menu.select).
+        The state is recorded at the start of every player turn, so the player can undo
+        rounds and the battle can be saved (see history).
+
+        :param player_select: SelectionMenu the player was selected from (to change Pokemon)
+        :param player: Selected player (None when continuing a saved battle)
+        :param saved: timeline of a saved battle to continue (a new battle if None)
+        :return: Winner
+        """
+        opponent = player.name if saved is None else saved.state.player
+        enemy_select = self.attach(SelectionMenu(self.pokemons,False,policy=self.enemy_policy,
+                                                 matchups=self.matchups,opponent=opponent))
+        # Create battle
+        fight = self.attach(FightMenu())
+        fight.log = self.log
+        if saved is None:
+            # Select enemy
+            enemy = yield from enemy_select.select()
+        else:
+            player, enemy = self.restore(saved.state, player_select, enemy_select, fight)
+        self.history = saved
+        if self.log is not None:
+            self.log.start(player, enemy, fight.turns)
+
+        # Battle
+        while not (player.hp == 0 or enemy.hp == 0):
+            if fight.player_turn:
+                previous = self.history.state if self.history is not None else None
+                current = battle_state.capture(player, enemy, player_select.created, self.pokemons,
+                                               fight.player_turn, fight.turns, previous)
+                if current != previous:
+                    self.history = timeline(current, self.history)
+            fight.undo = self.history is not None and self.history.previous is not None
+
+            choice = yield from fight.turn(player,enemy)
+            # Change pokemon
+            if choice == "Change Pokemon":
+                old = player
+                player = yield from player_select.swap_steps(player)
+                if self.log is not None:
+                    self.log.swap(old, player)
+            # Go back to the start of the previous round
+            elif choice == "Undo":
+                self.history = self.history.undo()
+                player, enemy = self.restore(self.history.state, player_select, enemy_select, fight)
+                if self.log is not None:
+                    self.log.rewind(fight.turns)
+
+        self.history = None
+        winner = max([player,enemy],key=lambda y: y.hp)
+        if self.log is not None:
+            self.log.end(winner, enemy if winner is player else player, 0 if winner is player else 1)
+        return winner
+
+    def restore(self, state, player_select, enemy_select, fight):
+        """
+        Function to set the Pokemons and fight menu to a battle state.
+
+        :param state: battle_state to go to
+        :param player_select: SelectionMenu of the player's Pokemons
+        :param enemy_select: SelectionMenu of the enemies
+        :param fight: FightMenu of the battle
+        :return: (player, enemy) in battle
+        """
+        bench = dict(state.bench)
+        for name in set(player_select.created) | set(bench):
+            pokemon = player_select.get_pokemon(name)
+            pokemon.hp = bench.get(name, self.pokemons[name]['HP'])
+            player_select.forget(pokemon)
+        player = player_select.get_pokemon(state.player)
+        player.hp = state.player_hp
+        player_select.forget(player)
+        enemy = enemy_select.get_pokemon(state.enemy)
+        enemy.hp = state.enemy_hp
+        fight.player_turn = state.player_turn
+        fight.turns = state.turn
+        return player, enemy
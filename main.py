@@ -1,8 +1,88 @@
-from game import game
+import argparse
+import os
+import random
+import sys
+from game import game, BATTLE_LOG
+from menu import menu
+import profiler
 
 def main():
+    parser = argparse.ArgumentParser(description="A simple terminal based pokemon game.")
+    parser.add_argument('--record', metavar='FILE', help="record the session to FILE (replay it with replay.py)")
+    parser.add_argument('--expert', nargs='?', const='policy.bin', metavar='TABLE',
+                        help="let the enemy play the best moves from a policy table (default policy.bin, built in the background if missing, or beforehand with solver.py)")
+    parser.add_argument('--mcts', nargs='?', type=float, const=50, metavar='MS',
+                        help="let the enemy pick moves with Monte Carlo rollouts for MS milliseconds per turn (default 50)")
+    parser.add_argument('--no-animation', action='store_true', help="show battles without animations")
+    parser.add_argument('--workers', type=int, default=0, help="extra processes running --mcts rollouts")
+    parser.add_argument('--profile', metavar='FILE', default=os.environ.get(profiler.ENV),
+                        help=f"record timings per frame and phase to FILE on exit (default ${profiler.ENV})")
+    parser.add_argument('--colors', type=int, choices=[24, 256, 16],
+                        help="color depth of the terminal (default: detected, or $POKEMON_COLORS)")
+    parser.add_argument('--log', default=BATTLE_LOG, metavar='FILE',
+                        help="append every battle to this battle log (see battlelog.py)")
+    parser.add_argument('--no-log', action='store_true', help="do not record battles")
+    parser.add_argument('--save', metavar='FILE', help="save the battle in progress to FILE when quitting")
+    parser.add_argument('--resume', metavar='FILE', help="continue a battle saved with --save")
+    parser.add_argument('--trace', action='store_true', help="write the profile in Chrome trace format")
+    args = parser.parse_args()
+
+    if args.profile:
+        profiler.enable()
+
     pokemon_game = game()
-    pokemon_game.loop()
+    if args.resume:
+        from state import timeline
+        pokemon_game.resume = timeline.load(args.resume)
+    if not args.no_log:
+        from battlelog import battle_log
+        pokemon_game.log = battle_log(args.log)
+    if args.colors:
+        menu.display.depth = args.colors
+    # Animations need a real terminal (piped output would only get longer)
+    if sys.stdout.isatty() and not args.no_animation:
+        from animation import scheduler
+        menu.animator = scheduler()
+    # AI opponents are imported only when asked for (multiprocessing is slow to import)
+    if args.expert:
+        from solver import policy_table, expert_policy
+        if os.path.exists(args.expert):
+            pokemon_game.enemy_policy = expert_policy(policy_table.load(args.expert))
+        else:
+            # Solving takes seconds: play the strongest moves until the table is built
+            pokemon_game.enemy_policy = expert_policy()
+            pokemon_game.enemy_policy.build(lambda: pokemon_game.pokemons, args.expert)
+    elif args.mcts:
+        from mcts import mcts_policy
+        pokemon_game.enemy_policy = mcts_policy(args.mcts / 1000, args.workers)
+    try:
+        if args.record:
+            from console import recorder
+            # Seed the enemy's random moves so the session replays exactly
+            seed = random.randrange(2**32)
+            random.seed(seed)
+            session = recorder(seed=seed)
+            menu.use_console(session)
+            try:
+                pokemon_game.loop()
+            finally:
+                session.save(args.record)
+        else:
+            pokemon_game.loop()
+    except (EOFError, KeyboardInterrupt):
+        # Input closed (Ctrl-D) or interrupted (Ctrl-C), quit quietly
+        menu.terminal.print()
+        if args.save and pokemon_game.history is not None:
+            pokemon_game.history.save(args.save)
+            menu.terminal.print(f"Battle saved to {args.save} (continue it with --resume {args.save})")
+    finally:
+        close = getattr(pokemon_game.enemy_policy, 'close', None)   # Stop the workers of mcts_policy
+        if close is not None:
+            close()
+        if pokemon_game.log is not None:
+            pokemon_game.log.close()
+        if args.profile:
+            profiler.disable().dump(args.profile, trace=args.trace)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
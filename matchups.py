@@ -0,0 +1,356 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b'PKMX'             # Matchup index file signature
+VERSION = 2
+HEADER = struct.Struct('<HIIq')     # Version, species count, distribution length, roster source mtime
+POLICIES = ('random', 'greedy')
+PROBABILITY_SCALE = 65535   # Win probabilities are stored as uint16 fixed point
+TAIL = 1e-9                 # Probability left over at which turns-to-KO distributions are cut off
+RECORD = struct.Struct('<4HHIH')    # Win probabilities, greedy hits, distribution offset and length
+
+
+def species_hash(stats):
+    """
+    Function that hashes the stats of a species (a changed hash means its matchups are stale).
+
+    :param stats: Pokemon stats ({"HP": ..., "moves": {...}})
+    :return: 8 byte digest
+    """
+    return hashlib.blake2b(json.dumps([stats['HP'], list(stats['moves'].items())]).encode(),
+                           digest_size=8).digest()
+
+
+def hits_distribution(hp, damage):
+    """
+    Function that calculates the distribution of the number of random hits needed
+    to knock out a Pokemon (every move equally likely, like enemy.attack).
+
+    :param hp: Hp of the Pokemon being attacked
+    :param damage: Damage of the moves of the attacker
+    :return: List where item n is the probability of needing n+1 hits
+             (the missing mass never knocks out, e.g. when all damage is 0)
+    """
+    if not any(hit > 0 for hit in damage):
+        return []       # No move does damage, the battle never ends
+    share = 1 / len(damage)
+    alive = {hp: 1.0}       # Remaining hp -> probability, for battles still going
+    distribution = []
+    while alive and sum(alive.values()) > TAIL:
+        knocked_out = 0.0
+        after = {}
+        for left, probability in alive.items():
+            for hit in damage:
+                if hit >= left:
+                    knocked_out += probability * share
+                else:
+                    after[left - hit] = after.get(left - hit, 0.0) + probability * share
+        distribution.append(knocked_out)
+        alive = after
+    return distribution
+
+
+def win_probability(hits, other_hits):
+    """
+    Function that calculates the win probability of the side moving first:
+    it wins when it needs no more hits than the other side, so
+    P(win) = sum over n of P(hits = n) * P(other hits >= n).
+
+    :param hits: Distribution of hits needed by the side moving first (see hits_distribution)
+    :param other_hits: Distribution of hits needed by the other side
+    :return: Win probability
+    """
+    # Probability that the other side needs n or more hits, starting from n = 1
+    at_least = 1.0
+    total = 0.0
+    for n, probability in enumerate(hits):
+        total += probability * at_least
+        if n < len(other_hits):
+            at_least -= other_hits[n]
+    return min(max(total, 0.0), 1.0)
+
+
+def greedy_distribution(hp, damage):
+    """
+    Function that creates the hits distribution of always using the strongest move.
+
+    :param hp: Hp of the Pokemon being attacked
+    :param damage: Damage of the moves of the attacker
+    :return: Distribution (see hits_distribution)
+    """
+    best = max(damage)
+    if best <= 0:
+        return []
+    return [0.0] * (-(-hp // best) - 1) + [1.0]
+
+
+class matchup:
+    """Precomputed outcome of a matchup (first moves first)."""
+    __slots__ = ('first', 'second', 'wins', 'greedy_hits', 'hits')
+
+    def __init__(self, first, second, wins, greedy_hits, hits):
+        """
+        Creates a matchup.
+
+        :param first: Name of the Pokemon moving first
+        :param second: Name of the other Pokemon
+        :param wins: Win probabilities of first, (first policy, second policy) -> probability
+        :param greedy_hits: Hits first needs with its strongest move (0 if it can not do damage)
+        :param hits: Random hits distribution of first (see hits_distribution)
+        """
+        self.first = first
+        self.second = second
+        self.wins = wins
+        self.greedy_hits = greedy_hits
+        self.hits = hits
+
+    def win_chance(self, policy='greedy', other_policy='random'):
+        """
+        Function that gets the win probability of the Pokemon moving first.
+
+        :param policy: Policy of the Pokemon moving first ('random' or 'greedy')
+        :param other_policy: Policy of the other Pokemon
+        :return: Win probability
+        """
+        return self.wins[(policy, other_policy)]
+
+    def __repr__(self):
+        return f"matchup({self.first!r} vs {self.second!r}, wins={self.wins})"
+
+
+class matchup_index:
+    """
+    Matchup outcomes of every ordered pair of species, stored in a binary file.
+    Only pairs with a changed species are recomputed when the roster changes.
+    """
+    def __init__(self, names, hashes, records, distributions, stamp=0, data=None):
+        """
+        Creates a matchup index (use open or build).
+
+        :param names: Species names in index order
+        :param hashes: Species hashes (same order)
+        :param records: Buffer of fixed size pair records, first * len(names) + second
+        :param distributions: Sequence of floats of all random hits distributions (array('f') or memoryview)
+        :param stamp: mtime of the roster source file the index was checked against (0 if unknown)
+        :param data: Memory-mapped index file the buffers are views of (None if they are in memory)
+        """
+        self.names = names
+        self.hashes = hashes
+        self.numbers = {name: number for number, name in enumerate(names)}
+        self.records = records
+        self.distributions = distributions
+        self.stamp = stamp
+        self.data = data
+
+    @staticmethod
+    def compute(first, second):
+        """
+        Function that computes the record of one pair.
+
+        :param first: Stats of the Pokemon moving first
+        :param second: Stats of the other Pokemon
+        :return: (win probabilities per policy pair, greedy hits, random hits distribution)
+        """
+        first_damage, second_damage = list(first['moves'].values()), list(second['moves'].values())
+        hits = {'random': (hits_distribution(second['HP'], first_damage),
+                           hits_distribution(first['HP'], second_damage)),
+                'greedy': (greedy_distribution(second['HP'], first_damage),
+                           greedy_distribution(first['HP'], second_damage))}
+        wins = tuple(win_probability(hits[policy][0], hits[other_policy][1])
+                     for policy in POLICIES for other_policy in POLICIES)
+        return wins, len(hits['greedy'][0]), hits['random'][0]
+
+    @classmethod
+    def build(cls, pokemons, previous=None):
+        """
+        Function that computes the index, reusing the pairs of a previous index whose species did not change.
+
+        :param pokemons: Pokemons (name -> stats, e.g. a roster)
+        :param previous: matchup_index to reuse pairs from (None to compute everything)
+        :return: matchup_index
+        """
+        names = list(pokemons)
+        hashes = [species_hash(pokemons[name]) for name in names]
+        old = {}
+        if previous is not None:
+            old = {hash: number for number, hash in enumerate(previous.hashes)}
+
+        records = bytearray()
+        distributions = array('f')
+        for first, first_hash in zip(names, hashes):
+            for second, second_hash in zip(names, hashes):
+                if first_hash in old and second_hash in old:
+                    found = previous.get(old[first_hash], old[second_hash])
+                    wins = tuple(found.wins[(policy, other)] for policy in POLICIES for other in POLICIES)
+                    greedy_hits, hits = found.greedy_hits, found.hits
+                else:
+                    wins, greedy_hits, hits = cls.compute(pokemons[first], pokemons[second])
+                records += RECORD.pack(*(round(win * PROBABILITY_SCALE) for win in wins),
+                                       greedy_hits, len(distributions), len(hits))
+                distributions.extend(hits)
+        return cls(names, hashes, bytes(records), distributions)
+
+    @classmethod
+    def open(cls, pokemons, path='matchups.bin', source=None):
+        """
+        Function that loads the index file, updating it first if species were added, removed or changed.
+        The species are only compared when the source file of the roster changed since the index
+        was checked (or if there is no source file), as that reads every species.
+
+        :param pokemons: Pokemons (name -> stats, e.g. a roster)
+        :param path: Index file path
+        :param source: Path of the file the Pokemons were read from (e.g. pokemon.json)
+        :return: matchup_index
+        """
+        stamp = os.stat(source).st_mtime_ns if source is not None else 0
+        index = None
+        if os.path.exists(path):
+            try:
+                index = cls.load(path)
+            except (ValueError, struct.error):
+                index = None    # Unreadable or old format, rebuild
+        if index is not None and stamp and index.stamp == stamp:
+            return index
+        if index is None or index.names != list(pokemons) or \
+                index.hashes != [species_hash(pokemons[name]) for name in index.names]:
+            previous = index
+            index = cls.build(pokemons, previous)
+            index.stamp = stamp
+            if previous is not None:
+                previous.close()
+            index.save(path)
+        elif index.stamp != stamp:
+            # Same species, only remember that they were checked against this source
+            index.stamp = stamp
+            with open(path, 'r+b') as index_file:
+                index_file.seek(len(MAGIC))
+                index_file.write(HEADER.pack(VERSION, len(index.names), len(index.distributions), stamp))
+        return index
+
+    def save(self, path):
+        """
+        Function that saves the index to a binary file.
+
+        :param path: File path
+        """
+        distributions = array('f')
+        distributions.frombytes(memoryview(self.distributions).cast('B'))
+        if sys.byteorder != 'little':
+            distributions.byteswap()
+        # Written next to the file and then renamed, so a crash never leaves a broken index
+        with open(path + '.tmp', 'wb') as index_file:
+            index_file.write(MAGIC + HEADER.pack(VERSION, len(self.names), len(distributions), self.stamp))
+            for name, hash in zip(self.names, self.hashes):
+                encoded = name.encode()
+                index_file.write(struct.pack('<H', len(encoded)) + encoded + hash)
+            index_file.write(self.records)
+            index_file.write(distributions.tobytes())
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Function that loads an index from a binary file. The file is memory-mapped:
+        only the names are read, records and distributions are read when looked up.
+
+        :param path: File path
+        :return: matchup_index
+        """
+        with open(path, 'rb') as index_file:
+            data = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if data[:4] != MAGIC:
+                raise ValueError(f"'{path}' is not a matchup index")
+            version, = struct.unpack_from('<H', data, 4)
+            if version != VERSION:
+                raise ValueError(f"Unsupported matchup index version {version} in '{path}'")
+            _, count, distribution_count, stamp = HEADER.unpack_from(data, 4)
+            offset = 4 + HEADER.size
+            names, hashes = [], []
+            for _ in range(count):
+                length, = struct.unpack_from('<H', data, offset)
+                offset += 2
+                names.append(data[offset:offset + length].decode())
+                hashes.append(data[offset + length:offset + length + 8])
+                offset += length + 8
+            size = count * count * RECORD.size
+            if len(data) < offset + size + 4 * distribution_count:
+                raise ValueError(f"Matchup index '{path}' is truncated")
+        except (ValueError, struct.error):
+            data.close()
+            raise
+        records = memoryview(data)[offset:offset + size]
+        distributions = memoryview(data)[offset + size:offset + size + 4 * distribution_count]
+        if sys.byteorder == 'little':
+            distributions = distributions.cast('f')
+        else:
+            swapped = array('f')
+            swapped.frombytes(distributions)
+            swapped.byteswap()
+            distributions.release()
+            distributions = swapped
+        return cls(names, hashes, records, distributions, stamp, data)
+
+    def close(self):
+        """Function that unmaps the index file (the index can not be used afterwards)."""
+        if self.data is not None:
+            for view in (self.records, self.distributions):
+                if isinstance(view, memoryview):
+                    view.release()
+            self.data.close()
+            self.data = None
+
+    def get(self, first, second):
+        """
+        Function that reads the record of a pair by number.
+
+        :param first: Number of the Pokemon moving first
+        :param second: Number of the other Pokemon
+        :return: matchup
+        """
+        *wins, greedy_hits, start, length = RECORD.unpack_from(self.records, (first * len(self.names) + second) * RECORD.size)
+        wins = {(policy, other): wins[ind * len(POLICIES) + ind_other] / PROBABILITY_SCALE
+                for ind, policy in enumerate(POLICIES) for ind_other, other in enumerate(POLICIES)}
+        return matchup(self.names[first], self.names[second], wins, greedy_hits,
+                       list(self.distributions[start:start + length]))
+
+    def lookup(self, first, second):
+        """
+        Function that looks up a matchup by name (O(1)).
+
+        :param first: Name of the Pokemon moving first
+        :param second: Name of the other Pokemon
+        :return: matchup, None if a name is not in the index
+        """
+        if first not in self.numbers or second not in self.numbers:
+            return None
+        return self.get(self.numbers[first], self.numbers[second])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the matchup index and print win chances.")
+    parser.add_argument('--roster', default='pokemon.json', help="roster json file")
+    parser.add_argument('--index', default='matchups.bin', help="matchup index file")
+    parser.add_argument('--policy', nargs=2, choices=POLICIES, default=['greedy', 'random'],
+                        metavar=('FIRST', 'SECOND'), help="policies of both sides (default: greedy random)")
+    args = parser.parse_args()
+
+    with open(args.roster) as pokemon_data:
+        pokemons = json.load(pokemon_data)
+    index = matchup_index.open(pokemons, args.index, args.roster)
+
+    width = max(len(name) for name in index.names) + 2
+    print(f"Win chance of the row moving first ({args.policy[0]} vs {args.policy[1]})")
+    print(" " * width + "".join(f"{name:>{width}}" for name in index.names))
+    for first in index.names:
+        chances = "".join(f"{index.lookup(first, second).win_chance(*args.policy):>{width}.0%}" for second in index.names)
+        print(f"{first:<{width}}{chances}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import random
+import time
+from math import log
+from concurrent.futures import ProcessPoolExecutor, wait
+from simulator import species
+
+BATCH = 16      # Rollouts between two clock checks
+GRACE = 0.2     # Part of the budget waited for worker results after the own search
+
+
+def rollout(damage, other_damage, hp, other_hp, rng):
+    """
+    Function that plays a battle to the end with random moves, the other side moving first.
+
+    :param damage: Damage of the moves of the searching side
+    :param other_damage: Damage of the moves of the other side
+    :param hp: Hp of the searching side
+    :param other_hp: Hp of the other side
+    :param rng: random.Random instance
+    :return: 1 if the searching side wins, 0 otherwise
+    """
+    choice = rng.choice
+    if not any(damage) and not any(other_damage):
+        return 0    # Nobody can win
+    while True:
+        hp -= choice(other_damage)
+        if hp <= 0:
+            return 0
+        other_hp -= choice(damage)
+        if other_hp <= 0:
+            return 1
+
+
+def search(damage, other_damage, hp, other_hp, budget, seed=None):
+    """
+    Function that runs UCB1 over the moves of the searching side with random playouts
+    until the time budget is used up.
+
+    :param damage: Damage of the moves of the searching side
+    :param other_damage: Damage of the moves of the other side
+    :param hp: Hp of the searching side
+    :param other_hp: Hp of the other side
+    :param budget: Search time in seconds
+    :param seed: Seed of the random generator (None for a random seed)
+    :return: (wins, visits) lists per move
+    """
+    rng = random.Random(seed)
+    moves = len(damage)
+    wins = [0] * moves
+    visits = [0] * moves
+    deadline = time.perf_counter() + budget
+    total = 0
+    while True:
+        for _ in range(BATCH):
+            if total < moves:
+                move = total    # Try every move once
+            else:
+                log_total = 2 * log(total)
+                move = max(range(moves),
+                           key=lambda ind: wins[ind] / visits[ind] + (log_total / visits[ind]) ** 0.5)
+            left = other_hp - damage[move]
+            result = 1 if left <= 0 else rollout(damage, other_damage, hp, left, rng)
+            wins[move] += result
+            visits[move] += 1
+            total += 1
+        if time.perf_counter() >= deadline:
+            return wins, visits
+
+
+class mcts_policy:
+    """
+    Enemy policy that picks the move with the best win rate estimated by
+    Monte Carlo rollouts within a per-turn time budget.
+    Rollouts run on plain hp/damage numbers (never on the player/enemy objects) and
+    optionally in worker processes as well, so the strength grows with the CPU time available.
+    """
+    def __init__(self, budget=0.05, workers=0, seed=None):
+        """
+        Creates an MCTS policy.
+
+        :param budget: Search time per turn in seconds
+        :param workers: Extra worker processes searching in parallel (0 to search in this process only)
+        :param seed: Seed of the random generators (None for random seeds)
+        """
+        self.budget = budget
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.pool = ProcessPoolExecutor(workers) if workers > 0 else None
+        self.species = {}       # Lightweight copies of the Pokemons seen so far (name -> species)
+        self.rollouts = 0       # Rollouts run over all turns
+
+    def choose(self, attacker, defender, hp, defender_hp):
+        """
+        Function that searches for the best move.
+
+        :param attacker: species of the searching side
+        :param defender: species of the other side
+        :param hp: Hp of the searching side
+        :param defender_hp: Hp of the other side
+        :return: Index of the chosen move
+        """
+        state = (attacker.damage, defender.damage, hp, defender_hp, self.budget)
+        futures = []
+        if self.pool is not None:
+            futures = [self.pool.submit(search, *state, self.rng.getrandbits(64)) for _ in range(self.workers)]
+        wins, visits = search(*state, self.rng.getrandbits(64))
+        if futures:
+            # Workers stop after the same budget; results arriving later are dropped so the turn never stalls
+            done, _ = wait(futures, timeout=self.budget * GRACE)
+            for future in done:
+                worker_wins, worker_visits = future.result()
+                wins = [a + b for a, b in zip(wins, worker_wins)]
+                visits = [a + b for a, b in zip(visits, worker_visits)]
+        self.rollouts += sum(visits)
+        return max(range(len(visits)), key=lambda ind: (wins[ind] / max(visits[ind], 1), attacker.damage[ind]))
+
+    def __call__(self, attacker, attackee):
+        """
+        Function that chooses the attack of an enemy (policy for enemy).
+
+        :param attacker: enemy that is attacking
+        :param attackee: Pokemon being attacked
+        :return: Attack name
+        """
+        state = [self.species.get(pokemon.name) for pokemon in (attacker, attackee)]
+        for ind, pokemon in enumerate((attacker, attackee)):
+            if state[ind] is None or state[ind].damage != tuple(pokemon.attacks.values()):
+                state[ind] = self.species[pokemon.name] = species(pokemon.name, {'HP': pokemon.hp, 'moves': pokemon.attacks})
+        move = self.choose(state[0], state[1], attacker.hp, attackee.hp)
+        return state[0].moves[move]
+
+    def policy(self, attacker, defender, attacker_hp, defender_hp, rng):
+        """
+        Policy for the headless simulator.
+
+        :param attacker: species that is attacking
+        :param defender: species being attacked
+        :param attacker_hp: Current hp of the attacker
+        :param defender_hp: Current hp of the defender
+        :param rng: random.Random instance (unused, the policy has its own generator)
+        :return: Index of the chosen move
+        """
+        return self.choose(attacker, defender, attacker_hp, defender_hp)
+
+    def close(self):
+        """Function that stops the worker processes."""
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
@@ -1,9 +1,38 @@
 from pokemon import player, enemy
 from dialogbox import dialogbox
-from sprite import sprite
+from sprite import registry
+from screen import screen, parse
+from console import console
+import profiler
+from framebuffer import framebuffer
+from animation import battle_scene, hit, entrance
+
+class shared:
+    """Class attribute that is created on first use, so importing menu sets nothing up."""
+    def __init__(self, create):
+        """
+        Creates a shared attribute.
+
+        :param create: Function creating the value
+        """
+        self.create = create
+
+    def __set_name__(self, owner, name):
+        self.owner = owner
+        self.name = name
+
+    def __get__(self, instance, owner):
+        value = self.create()
+        setattr(self.owner, self.name, value)   # Replaces this placeholder on the class
+        return value
+
 
 class menu:
     """Basic (parent) menu class."""
+    terminal = shared(console)                          # Input source and output sink shared by all menus
+    display = shared(lambda: screen(menu.terminal))     # Screen shared by all menus (repaints only what changed)
+    animator = None             # scheduler playing battle animations (no animations if None)
+
     def __init__(self,input_text=None):
         """
         Creates a menu
@@ -20,29 +49,54 @@ class menu:
         self.dialog = dialogbox(border=2)   # Dialogbox
 
 
+    @staticmethod
+    def use_console(new_console):
+        """
+        Function to send the input and output of all menus through a console.
+        The color depth of the current screen is kept.
+
+        :param new_console: console to use (e.g. scripted input and a buffer as output)
+        """
+        menu.terminal = new_console
+        menu.display = screen(new_console, depth=menu.display.depth)
+
     def show_and_select(self):
         """
         Function to show the menu and select menu action choices.
 
+        :return: Menu selection
+        """
+        return self.terminal.run(self.select())
+
+    def select(self):
+        """
+        Step-wise version of show_and_select: yields prompts and receives the input lines,
+        so menus can also be driven without blocking (see server.py).
+
         :return: Menu selection
         """
         self.render()
-        choice = input(self.input_text)
+        choice = yield self.input_text
 
         # Check wether input is a digit and is a valid choice
         while not choice.isdigit() or (not 0 <= int(choice) < len(self.actions)):
             self.render()
-            print(f"Please show a valid option (0 - {len(self.actions)-1}).")
-            choice = input(self.input_text)
+            self.terminal.print(f"Please show a valid option (0 - {len(self.actions)-1}).")
+            choice = yield self.input_text
         
-        print()
+        self.terminal.print()
         action = self.actions[int(choice)]
         return action
 
     def render(self):
         """Function to render menu elements (pokemons, dialog, title)."""
-        print("\n".join(self.menu_content))
-        self.dialog.show()
+        with profiler.span('compose'):
+            frame = "\n".join(self.menu_content)
+        if self.dialog.lines != None:
+            with profiler.span('dialog'):
+                self.dialog.render()
+            frame += "\n" + self.dialog.ansi
+        self.display.draw(frame)
         
     def to_choice(self, text, ind = None):
         """
@@ -60,16 +114,20 @@ class menu:
 
 class MainMenu(menu):
     """Main menu class."""
-    def __init__(self):
-        """Creates a main menu."""
+    def __init__(self, pvp=False):
+        """
+        Creates a main menu.
+
+        :param pvp: bool for offering battles against other players
+        """
         # Define action choices
-        self.actions = ["Play","Exit"]
+        self.actions = ["Play","Player vs player","Exit"] if pvp else ["Play","Exit"]
 
         super().__init__()
 
         # Define dialog text and menu render content
         dialog_text = self.to_choice(self.actions)
-        title = sprite('Title')
+        title = registry.get('Title')
         self.width = title.width
         self.dialog(dialog_text)
         self.dialog.center(self.width)
@@ -77,29 +135,157 @@ class MainMenu(menu):
 
 
 class SelectionMenu(menu):
-    """Pokemon selection class."""
-    def __init__(self,pokemons,sprites,is_player):
+    """Paged Pokemon selection class (only the visible page is rendered)."""
+    def __init__(self,pokemons,is_player,page_size=5,policy=None,matchups=None,opponent=None):
         """
         Creates a Pokemon selection menu.
 
-        :param pokemons: Pokemons to be selected from
-        :param sprites: Corrseponding Pokemon sprites
+        :param pokemons: Pokemons to be selected from (name -> stats, e.g. a roster)
         :param is_player: bool for checking if player or enemy
+        :param page_size: Pokemons shown per page
+        :param policy: Attack policy given to enemies (random attacks if None)
+        :param matchups: matchup_index for showing win chances (None to hide them)
+        :param opponent: Name of the player's Pokemon the win chances are shown for
         """
         self.is_player = is_player
-        
-        # Define action choices
-        if self.is_player:
-            self.actions = [player(name,pokemons[name],sprites[ind]) for ind,name in enumerate(pokemons)]
-        else:
-            self.actions = [enemy(name,pokemons[name],sprites[ind]) for ind,name in enumerate(pokemons)]
-        
-        # Define dialog text, input text and menu content
+        self.policy = policy
+        self.matchups = matchups
+        self.opponent = opponent
+        self.pokemons = pokemons
+        self.page_size = page_size
+
+        self.created = {}               # Pokemons created so far (name -> player/enemy)
+        self.entries = {}               # Rendered Pokemon entries (name -> text)
+        self.pages = {}                 # Rendered pages ((search, page) -> (names, menu content))
+        self.search = ""                # Current search text
+        self.actions = list(pokemons)   # Names of the Pokemons matching the search
+        self.page = 0                   # Current page
+
+        # Define input text
         input_text = "Select a Pokemon: " if is_player else "Select an enemy Pokemon: "
         super().__init__(input_text)
-        for i,action in enumerate(self.actions):
-            action_sprite = action.get_sprite(moves=True,spacing=4)
-            self.menu_content.append(f"{self.to_choice(action.name,i)}\n\n{action_sprite.text}")
+
+    def get_pokemon(self, name):
+        """
+        Function to get the Pokemon with a given name, creating it the first time.
+
+        :param name: Pokemon name
+        :return: player or enemy
+        """
+        if name not in self.created:
+            # Sprites are loaded through the shared registry (players get the flipped sprite from its cache)
+            if self.is_player:
+                self.created[name] = player(name,self.pokemons[name],registry.get(name, flipped=True),flipped=True)
+            else:
+                self.created[name] = enemy(name,self.pokemons[name],registry.get(name),self.policy)
+        return self.created[name]
+
+    def win_chance(self, name):
+        """
+        Function to get the win chance text of the opponent against a Pokemon.
+
+        :param name: Pokemon name
+        :return: Win chance text (empty if unknown)
+        """
+        if self.matchups is None or self.opponent is None:
+            return ""
+        found = self.matchups.lookup(self.opponent, name)
+        if found is None:
+            return ""
+        # The player moves first and is assumed to use its strongest attacks
+        chance = found.win_chance('greedy', 'random' if self.policy is None else 'greedy')
+        return f"{' '*5}win chance vs {name}: {chance:.0%}"
+
+    def page_count(self):
+        """
+        Function to get the number of pages.
+
+        :return: Number of pages (at least 1)
+        """
+        return max(1, -(-len(self.actions) // self.page_size))
+
+    def show_page(self):
+        """Function to define the menu content and dialog of the current page."""
+        key = (self.search, self.page)
+        if key not in self.pages:
+            start = self.page * self.page_size
+            names = self.actions[start:start+self.page_size]
+            content = []
+            for i,name in enumerate(names,start):
+                if name not in self.entries:
+                    self.entries[name] = self.get_pokemon(name).get_sprite(moves=True,spacing=4).text
+                content.append(f"{self.to_choice(name,i)}{self.win_chance(name)}\n\n{self.entries[name]}")
+            self.pages[key] = (names, content)
+        self.menu_content = list(self.pages[key][1])
+
+        # Show paging and search help when there is more than one page (or a search)
+        if self.page_count() > 1 or self.search:
+            found = f"{len(self.actions)} found for '{self.search}', " if self.search else ""
+            self.dialog([f"{found}page {self.page+1}/{self.page_count()}",
+                         "n - next page     p - previous page",
+                         "/text - search name or move     / - show all"])
+        else:
+            self.dialog.lines = None
+
+    def command(self, choice):
+        """
+        Function to handle paging and search commands.
+
+        :param choice: User input
+        :return: True if the input was a command
+        """
+        if choice == "n":
+            self.page = min(self.page + 1, self.page_count() - 1)
+        elif choice == "p":
+            self.page = max(self.page - 1, 0)
+        elif choice.startswith("/"):
+            self.search = choice[1:].strip()
+            self.actions = self.find(self.search)
+            self.page = 0
+        else:
+            return False
+        return True
+
+    def find(self, text):
+        """
+        Function to find Pokemons whose name or one of whose moves contains a text.
+
+        :param text: Text to search for (all Pokemons if empty)
+        :return: Matching names
+        """
+        if not text:
+            return list(self.pokemons)
+        if hasattr(self.pokemons, 'search'):
+            return self.pokemons.search(text)
+        text = text.lower()
+        return [name for name, stats in self.pokemons.items()
+                if text in name.lower() or any(text in move.lower() for move in stats['moves'])]
+
+    def select(self):
+        """
+        Function to show the current page and select a Pokemon (step-wise, see menu.select).
+
+        :return: Selected Pokemon
+        """
+        self.show_page()
+        self.render()
+        choice = yield self.input_text
+
+        # Check wether input is a command or a valid choice
+        while not choice.isdigit() or (not 0 <= int(choice) < len(self.actions)):
+            if self.command(choice):
+                self.show_page()
+                self.render()
+            else:
+                self.render()
+                if self.actions:
+                    self.terminal.print(f"Please show a valid option (0 - {len(self.actions)-1}).")
+                else:
+                    self.terminal.print("No Pokemon found, type / to show all.")
+            choice = yield self.input_text
+
+        self.terminal.print()
+        return self.get_pokemon(self.actions[int(choice)])
 
     def swap(self, pokemon):
         """
@@ -108,21 +294,37 @@ class SelectionMenu(menu):
         :param pokemon: Current pokemon (to update in list)
         :return: Selected pokemon to swap to
         """
-        self.menu_content = []
-        for ind,action in enumerate(self.actions):
-            # Update current pokemon in Pokemon list
-            if action.name == pokemon.name:
-                self.actions[ind] = pokemon
+        return self.terminal.run(self.swap_steps(pokemon))
+
+    def swap_steps(self, pokemon):
+        """
+        Step-wise version of swap (see menu.select).
+
+        :param pokemon: Current pokemon (to update in list)
+        :return: Selected pokemon to swap to
+        """
+        self.forget(pokemon)
+        return (yield from self.select())
 
-            action_sprite = action.get_sprite(moves=True,spacing=4)
-            self.menu_content.append(f"{self.to_choice(action.name,ind)}\n\n{action_sprite.text}")    
-        return self.show_and_select()     
+    def forget(self, pokemon):
+        """
+        Function to update a Pokemon whose hp changed and only forget its rendered entry.
+
+        :param pokemon: Changed pokemon
+        """
+        self.created[pokemon.name] = pokemon
+        self.entries.pop(pokemon.name, None)
+        self.pages = {key: page for key, page in self.pages.items() if pokemon.name not in page[0]}
 
 class FightMenu(menu):
     """Pokemon fight menu class."""
     def __init__(self):
         """Creates a fight menu"""
         self.player_turn = True         # bool for turn
+        self.entered = False            # bool for the Pokemons having slid in
+        self.log = None                 # battle_log recording the attacks (not recorded if None)
+        self.undo = False               # bool for offering to undo the last round
+        self.turns = 0                  # Attacks made
         
         super().__init__()
 
@@ -133,11 +335,106 @@ class FightMenu(menu):
         :param pokemon: Pokemon that used an attack
         :param attack: Attack used by pokemon
         """
+        self.terminal.run(self.message(pokemon,attack))
+
+    def message(self,pokemon,attack,effect=None):
+        """
+        Step-wise version of attack_message (see menu.select).
+
+        :param pokemon: Pokemon that used an attack
+        :param attack: Attack used by pokemon
+        :param effect: Function playing an animation above the message (see hit_effect)
+        """
         input_text = "Press enter to continue."
         self.dialog([f"{pokemon.name} used {attack}", "It was effective."])
         self.dialog.center(self.width)
+        if effect is not None:
+            effect()
         self.render()
-        input(input_text)
+        yield input_text
+
+    def animate(self, scene, moving):
+        """
+        Function that plays a battle animation above the dialog (if menus are animated).
+        Frames too tall for the terminal are not animated (they would scroll).
+
+        :param scene: battle_scene to animate
+        :param moving: animation to play
+        """
+        if self.animator is None:
+            return
+        # Same layout as render: the battle, an empty line and the dialog
+        below = framebuffer(0, 1)
+        if self.dialog.lines != None:
+            self.dialog.render()
+            below = below.stack(parse(self.dialog.ansi))
+
+        def frame(progress):
+            with profiler.span('compose'):
+                return moving.render(scene, progress).stack(below)
+        if self.display.fits(frame(1)):
+            self.animator.play(moving.duration, frame, self.display.draw_frame)
+
+    def hit_effect(self, Player, Enemy, side, old_hp):
+        """
+        Function that creates the effect animating an attack (see message).
+
+        :param Player: Pokemon on the left
+        :param Enemy: Pokemon on the right
+        :param side: Attacked side ('left' or 'right')
+        :param old_hp: HP of the attacked Pokemon before the attack
+        :return: Function playing the animation, None if menus are not animated
+        """
+        if self.animator is None:
+            return None
+        scene = battle_scene(Player, Enemy)
+        new_hp = Enemy.hp if side == 'right' else Player.hp
+
+        def effect():
+            self.animate(scene, hit(side, old_hp, new_hp))
+            self.show_battle(Player, Enemy)     # The message is shown below the new HP
+        return effect
+
+    def show_battle(self, Player, Enemy):
+        """
+        Function to show both Pokemons in battle as menu content.
+
+        :param Player: Pokemon on the left
+        :param Enemy: Pokemon on the right
+        """
+        battle_sprite = Player.render_in_battle(Enemy)
+        self.menu_content = [battle_sprite.text]
+        self.width = battle_sprite.width
+
+    def choose(self, Player, can_change=True):
+        """
+        Function to select an attack (step-wise, see menu.select).
+
+        :param Player: Pokemon to select an attack of
+        :param can_change: bool for offering to change Pokemon
+        :return: Selected attack (or "Change Pokemon" or "Undo")
+        """
+        # Define action choices
+        self.actions = (list(Player.attacks.keys()) + (["Change Pokemon"] if can_change else [])
+                        + (["Undo"] if self.undo else []))
+
+        # Define dialog text
+        actions_dialog = []
+        for ind, action in enumerate(self.actions):
+            action_as_choice = self.to_choice(action,ind)  # convert action to choice format
+            # Put every 2 action choices on the same line
+            if ind % 2 == 0 and ind < len(self.actions)-1:
+                next_action_choice = self.to_choice(self.actions[ind+1],ind+1)
+                actions_dialog.append(f"{action_as_choice}{' '*5}{next_action_choice}")
+            # Add last action choice if uneven amount
+            elif ind % 2 == 0:
+                actions_dialog.append(action_as_choice)
+        
+        self.dialog(actions_dialog)
+        self.dialog.center(self.width)
+
+        # Choose attack
+        return (yield from self.select())
 
     def battle(self, Player, Enemy):
         """
@@ -145,74 +442,84 @@ class FightMenu(menu):
         
         :Param Player: Playable Pokemon
         :param Enemy: Enemy (AI) Pokemon
+        :return: "Change Pokemon" or "Undo" if the player chose it, None after an attack
+        """
+        return self.terminal.run(self.turn(Player, Enemy))
+
+    def turn(self, Player, Enemy):
+        """
+        Step-wise version of battle (see menu.select).
+
+        :Param Player: Playable Pokemon
+        :param Enemy: Enemy (AI) Pokemon
+        :return: "Change Pokemon" or "Undo" if the player chose it, None after an attack
         """
 
         # Define menu content
-        battle_sprite = Player.render_in_battle(Enemy)
-        self.menu_content = [battle_sprite.text]
-        
-        self.width = battle_sprite.width
+        self.show_battle(Player, Enemy)
 
-        if self.player_turn:
-            # Define action choices
-            self.actions = list(Player.attacks.keys()) + ["Change Pokemon"]
-
-            # Define dialog text
-            actions_dialog = []
-            for ind, action in enumerate(self.actions):
-                action_as_choice = self.to_choice(action,ind)  # convert action to choice format
-                # Put every 2 action choices on the same line
-                if ind % 2 == 0 and ind < len(self.actions)-1:
-                    next_action_choice = self.to_choice(self.actions[ind+1],ind+1)
-                    actions_dialog.append(f"{action_as_choice}{' '*5}{next_action_choice}")
-                # Add last action choice if uneven amount
-                elif ind == len(self.actions)-1:
-                    actions_dialog.append(action_as_choice)
-            
-            self.dialog(actions_dialog)
-            self.dialog.center(self.width)
+        # Slide the Pokemons in at the start of the battle
+        if not self.entered:
+            self.entered = True
+            if self.animator is not None:
+                scene = battle_scene(Player, Enemy)
+                self.animate(scene, entrance(scene))
 
+        if self.player_turn:
             # Choose attack
-            choice = self.show_and_select()
+            choice = yield from self.choose(Player)
 
-            # Attack
-            if choice != self.actions[-1]:
-                Enemy = Player.attack(choice,Enemy)
-                self.attack_message(Player,choice)
+            # Change Pokemon or undo
+            if choice not in Player.attacks:
+                return choice
 
-                if Enemy.hp < 0:
-                    Enemy.hp = 0
+            # Attack
+            old_hp = Enemy.hp
+            Enemy = Player.attack(choice,Enemy)
+            self.turns += 1
+            if Enemy.hp < 0:
+                Enemy.hp = 0
+            if self.log is not None:
+                self.log.attack(0, Player, choice, Player.attacks[choice], Enemy.hp)
+            yield from self.message(Player,choice,self.hit_effect(Player,Enemy,'right',old_hp))
 
-                # Define menu content
-                battle_sprite = Player.render_in_battle(Enemy)
-                self.menu_content = [battle_sprite.text]
+            # Define menu content
+            battle_sprite = Player.render_in_battle(Enemy)
+            self.menu_content = [battle_sprite.text]
 
-                # swap player
-                self.player_turn = not self.player_turn
+            # swap player
+            self.player_turn = not self.player_turn
         else:
             # Attack
+            old_hp = Player.hp
             Player, choice = Enemy.attack(Player)
+            self.turns += 1
             if Player.hp < 0:
                 Player.hp = 0
+            if self.log is not None:
+                self.log.attack(1, Enemy, choice, Enemy.attacks[choice], Player.hp)
 
             # Define menu content
             battle_sprite = Player.render_in_battle(Enemy)
             self.menu_content = [battle_sprite.text]
-            self.attack_message(Enemy, choice)
+            yield from self.message(Enemy, choice, self.hit_effect(Player, Enemy, 'left', old_hp))
             self.player_turn = not self.player_turn
-        return choice == self.actions[-1]
+        return None
 
 class GameOver(menu):
     """Game over menu"""
-    def __init__(self, winner):
+    def __init__(self, winner, won=None):
         """
         Creates a Game Over menu
 
         :param winner: Pokemon that won the batle
+        :param won: bool for the player winning (True if the winner is a player if None)
         """
         self.actions = ["Play again","Exit"]
         super().__init__()
-        text = "You Win!" if type(winner) == player else "You Lose!"
+        if won is None:
+            won = type(winner) == player
+        text = "You Win!" if won else "You Lose!"
         Win_dialog = [text,""] + self.to_choice(self.actions)
         self.dialog(Win_dialog)
         self.dialog.center(winner.sprite.width)
@@ -0,0 +1,126 @@
+import os
+import warnings
+from array import array
+from functools import lru_cache
+import ansi
+from framebuffer import framebuffer, DEFAULT
+
+DEPTHS = (24, 256, 16)      # Supported color depths (24 = 24-bit RGB)
+ENV = 'POKEMON_COLORS'      # Environment variable forcing a color depth
+
+# Standard xterm colors of the 16 basic palette entries
+BASIC = ((0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0), (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+         (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0), (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255))
+CUBE = (0, 95, 135, 175, 215, 255)      # Channel levels of the 6x6x6 color cube (palette 16-231)
+
+
+def detect(environ=None):
+    """
+    Function that detects the color depth of the terminal from the environment.
+    Unknown terminals get 24-bit colors. An invalid forced depth is ignored with a warning.
+
+    :param environ: Environment variables (os.environ if None)
+    :return: Color depth (24, 256 or 16)
+    """
+    environ = os.environ if environ is None else environ
+    forced = environ.get(ENV)
+    if forced:
+        try:
+            depth = int(forced)
+        except ValueError:
+            depth = None
+        if depth in DEPTHS:
+            return depth
+        warnings.warn(f"Ignoring {ENV}={forced!r} (must be one of {', '.join(map(str, DEPTHS))}), detecting the color depth")
+    if environ.get('COLORTERM', '').lower() in ('truecolor', '24bit'):
+        return 24
+    term = environ.get('TERM', '')
+    if '256' in term:
+        return 256
+    if term in ('linux', 'ansi', 'cygwin', 'screen', 'tmux', 'dumb') or term.startswith('vt') or term.endswith(('-16color', '-color')):
+        return 16
+    return 24
+
+
+def palette_rgb(index):
+    """
+    Function that gets the RGB value of a 256 color palette entry.
+
+    :param index: Palette index
+    :return: (r, g, b) tuple
+    """
+    if index < 16:
+        return BASIC[index]
+    if index < 232:
+        index -= 16
+        return CUBE[index // 36], CUBE[index // 6 % 6], CUBE[index % 6]
+    gray = 8 + 10 * (index - 232)
+    return gray, gray, gray
+
+
+def distance(a, b):
+    """
+    Function that calculates the squared distance between two RGB colors.
+
+    :param a: (r, g, b) tuple
+    :param b: (r, g, b) tuple
+    :return: Squared distance
+    """
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+@lru_cache(maxsize=None)
+def table(depth):
+    """
+    Function that builds the lookup table from 15-bit RGB (5 bits per channel, red highest)
+    to palette index. The 256 color table uses the color cube and gray ramp (not the basic
+    colors, those differ between terminals); the 16 color table maps those entries on to
+    the nearest basic color. Built once per depth, on first use.
+
+    :param depth: 256 or 16
+    :return: array('B') of 32768 palette indices
+    """
+    if depth == 16:
+        basic = [min(range(16), key=lambda i: distance(BASIC[i], palette_rgb(index))) for index in range(256)]
+        return array('B', (basic[index] for index in table(256)))
+
+    levels = [(v << 3) | (v >> 2) for v in range(32)]      # 5-bit channel -> 8-bit value
+    cube = [min(range(6), key=lambda i: abs(CUBE[i] - value)) for value in levels]
+    lut = array('B', bytes(32768))
+    for r in range(32):
+        for g in range(32):
+            for b in range(32):
+                rgb = levels[r], levels[g], levels[b]
+                cube_index = 16 + 36 * cube[r] + 6 * cube[g] + cube[b]
+                gray_index = 232 + min(23, max(0, round((sum(rgb) / 3 - 8) / 10)))
+                nearest = min(cube_index, gray_index, key=lambda index: distance(rgb, palette_rgb(index)))
+                lut[(r << 10) | (g << 5) | b] = nearest
+    return lut
+
+
+def reduce_colors(colors, lut):
+    """
+    Function that maps packed RGB colors to palette colors.
+    Default and palette colors are kept.
+
+    :param colors: array('I') of packed colors
+    :param lut: Lookup table (see table)
+    :return: array('I') of packed colors
+    """
+    return array('I', [color if color >= DEFAULT else
+                       ansi.INDEXED | lut[((color >> 9) & 0x7C00) | ((color >> 6) & 0x3E0) | ((color >> 3) & 0x1F)]
+                       for color in colors])
+
+
+def reduce(frame, depth):
+    """
+    Function that converts the colors of a framebuffer to a lower color depth.
+
+    :param frame: framebuffer
+    :param depth: Color depth (24, 256 or 16)
+    :return: framebuffer (the same one for 24-bit colors)
+    """
+    if depth == 24:
+        return frame
+    lut = table(depth)
+    return framebuffer(frame.width, frame.height, frame.glyphs, reduce_colors(frame.fg, lut), reduce_colors(frame.bg, lut))
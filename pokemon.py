@@ -1,5 +1,4 @@
 import random
-from sprite import sprite
 
 class pokemon:
     """Pokemon class."""
@@ -14,29 +13,31 @@ class pokemon:
         self.hp = stats['HP']           # Pokemon health
         self.attacks = stats["moves"]   # Pokemon attacks
 
-    def get_sprite(self,hp=True,moves=False,spacing = None) :
+    def get_sprite(self,hp=True,moves=False,spacing = None,flipped=False) :
         """
         Function to get Pokemon's sprite (with stats if needed)
 
         :param hp: Bool for returning hp
         :param moves: Bool for returning moves
         :param spacing: Space before sprite
+        :param flipped: Bool for facing the other way
         :return: Sprite (with stats)
         """
+        base = self.sprite.flip() if flipped else self.sprite
         # Return sprite without stats
         if hp == moves == False and spacing == None:
-            return(self.sprite)
+            return(base)
         # Load sprites stored spacing (if not given)
         if spacing == None:
-            spacing = self.sprite.spacing
+            spacing = base.spacing
 
         attack_names = list(self.attacks.keys())
-        sprite_lines = self.sprite.lines.copy()
+        stat_lines = []
         if hp:
-            sprite_lines.append(f"HP: {self.hp}")
+            stat_lines.append(f"HP: {self.hp}")
         if moves:
-            sprite_lines.append(f"Moves: {', '.join(attack_names)}")
-        new_sprite = sprite(lines = sprite_lines,spacing=spacing)
+            stat_lines.append(f"Moves: {', '.join(attack_names)}")
+        new_sprite = base.add_lines(stat_lines,spacing=spacing)
         return new_sprite
 
     def render_in_battle(self, enemy, distance=10):
@@ -48,7 +49,8 @@ class pokemon:
         :return: Sprite of 2 pokemon in battle
         """
         player_sprite = self.get_sprite()
-        enemy_sprite = enemy.get_sprite()
+        # A player faces right, so turn it around when it is the opponent (player vs player)
+        enemy_sprite = enemy.get_sprite(flipped=isinstance(enemy, player))
         return(player_sprite.join(enemy_sprite,distance))
 
     def do_attack(self,attack,attackee):
@@ -65,16 +67,17 @@ class pokemon:
 
 class player (pokemon):
     """Player class"""
-    def __init__(self,name, stats, sprite):
+    def __init__(self,name, stats, sprite, flipped=False):
         """
         Creates a playable pokemon
 
         :param name: Pokemon name
         :param stats: Pokemon stats
         :param sprite: Pokemon sprite
+        :param flipped: Bool for a sprite that already faces the enemy (e.g. registry.get(name, flipped=True))
         """
         # flip to face enemy
-        self.sprite = sprite.flip()
+        self.sprite = sprite if flipped else sprite.flip()
 
         super().__init__(name,stats)
 
@@ -90,27 +93,32 @@ class player (pokemon):
 
 class enemy (pokemon):
     """Enemy class"""
-    def __init__(self,name, stats, sprite):
+    def __init__(self,name, stats, sprite, policy=None):
         """
         Creates a pokemon AI
 
         :param name: Pokemon name
         :param stats: Pokemon stats
         :param sprite: Pokemon sprite
+        :param policy: Function (enemy, attackee) -> attack name choosing the attacks (random if None)
         """
         self.sprite = sprite
+        self.policy = policy
         super().__init__(name, stats)
 
     def attack(self,attackee):
         """
-        Function to perform a random attack on an enemy.
+        Function to perform a random (or policy chosen) attack on an enemy.
 
         :param attack: attack to use
         :param attackee: enemy to use attack on
         :return: enemy with updated hp
         """
-        index = random.randint(0,len(self.attacks)-1)
-        attack = list(self.attacks.keys())[index]
+        if self.policy is not None:
+            attack = self.policy(self, attackee)
+        else:
+            index = random.randint(0,len(self.attacks)-1)
+            attack = list(self.attacks.keys())[index]
         return self.do_attack(attack,attackee),attack
         
 
@@ -0,0 +1,165 @@
+import os
+import time
+from collections import deque
+
+PHASES = ('load', 'compose', 'dialog', 'write', 'input-wait')
+ENV = 'POKEMON_PROFILE'     # Environment variable with the profile path (profiling is off if unset)
+
+current = None      # Active profiler (instrumentation hooks do nothing if None)
+
+
+class profiler:
+    """Records timings and byte counts per phase and per frame in bounded ring buffers."""
+    def __init__(self, size=4096, clock=time.perf_counter):
+        """
+        Creates a profiler.
+
+        :param size: Spans and frames kept (older ones are dropped)
+        :param clock: Function returning the current time in seconds
+        """
+        self.clock = clock
+        self.origin = clock()               # Time 0 of the recording
+        self.spans = deque(maxlen=size)     # (phase, start, duration, bytes, frame)
+        self.frames = deque(maxlen=size)    # Finished frames (see end_frame)
+        self.totals = {phase: [0.0, 0, 0] for phase in PHASES}     # Phase -> [seconds, spans, bytes] of all frames
+        self.frame = 0                      # Number of the frame being recorded
+        self.frame_start = self.origin      # Start of the frame being recorded
+        self.phases = {}                    # Phase -> [seconds, bytes] of the frame being recorded
+
+    def record(self, phase, start, size=0):
+        """
+        Function that records a span that ends now.
+
+        :param phase: One of PHASES
+        :param start: Start time (from clock)
+        :param size: Bytes handled in the span
+        """
+        duration = self.clock() - start
+        self.spans.append((phase, start, duration, size, self.frame))
+        frame_phase = self.phases.setdefault(phase, [0.0, 0])
+        frame_phase[0] += duration
+        frame_phase[1] += size
+        total = self.totals[phase]
+        total[0] += duration
+        total[1] += 1
+        total[2] += size
+
+    def end_frame(self):
+        """Function that finishes the frame being recorded (called after a frame is drawn)."""
+        now = self.clock()
+        self.frames.append({
+            'frame': self.frame,
+            'start_ms': round((self.frame_start - self.origin) * 1000, 3),
+            'duration_ms': round((now - self.frame_start) * 1000, 3),
+            'phases': {phase: round(seconds * 1000, 3) for phase, (seconds, _) in self.phases.items()},
+            'bytes': self.phases.get('write', (0, 0))[1],     # Bytes written to the terminal
+        })
+        self.frame += 1
+        self.frame_start = now
+        self.phases = {}
+
+    def summary(self):
+        """
+        Function that summarizes the recording.
+
+        :return: Dictionary with the recorded frames and the totals per phase
+        """
+        return {
+            'frames': list(self.frames),
+            'totals': {phase: {'ms': round(seconds * 1000, 3), 'spans': spans, 'bytes': size}
+                       for phase, (seconds, spans, size) in self.totals.items()},
+        }
+
+    def trace(self):
+        """
+        Function that converts the recording to the Chrome trace event format
+        (open it in chrome://tracing or Perfetto). Frames are on thread 0, phases on thread 1.
+
+        :return: Dictionary of trace events
+        """
+        pid = os.getpid()
+        events = [{'name': f"frame {frame['frame']}", 'ph': 'X', 'pid': pid, 'tid': 0,
+                   'ts': round(frame['start_ms'] * 1000, 1), 'dur': round(frame['duration_ms'] * 1000, 1),
+                   'args': {'bytes': frame['bytes']}} for frame in self.frames]
+        events += [{'name': phase, 'ph': 'X', 'pid': pid, 'tid': 1,
+                    'ts': round((start - self.origin) * 1e6, 1), 'dur': round(duration * 1e6, 1),
+                    'args': {'bytes': size, 'frame': frame}}
+                   for phase, start, duration, size, frame in self.spans]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path, trace=False):
+        """
+        Function that writes the recording to a file.
+
+        :param path: Output file path
+        :param trace: bool for the Chrome trace format (summary json otherwise)
+        """
+        import json     # Imported on exit, so it does not delay the first frame
+        with open(path, 'w') as profile_file:
+            json.dump(self.trace() if trace else self.summary(), profile_file)
+
+
+class span:
+    """
+    Context that records the time spent in it as a span of a phase, when profiling is on:
+
+        with profiler.span('write') as timed:
+            stream.write(text)
+            if timed:       # Only measure the size when profiling
+                timed.size = len(text.encode())
+    """
+    __slots__ = ('phase', 'size', 'active', 'start')
+
+    def __init__(self, phase, size=0):
+        """
+        Creates a span.
+
+        :param phase: One of PHASES
+        :param size: Bytes handled in the span (can be set inside the context)
+        """
+        self.phase = phase
+        self.size = size
+        self.active = None      # Profiler recording the span (None if profiling is off)
+
+    def __enter__(self):
+        self.active = current
+        if self.active is not None:
+            self.start = self.active.clock()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.active is not None:
+            self.active.record(self.phase, self.start, self.size)
+
+    def __bool__(self):
+        """bool for the span being recorded."""
+        return self.active is not None
+
+
+def end_frame():
+    """Function that finishes the frame being recorded (does nothing when profiling is off)."""
+    if current is not None:
+        current.end_frame()
+
+
+def enable(size=4096):
+    """
+    Function that starts recording for all instrumentation hooks.
+
+    :param size: Spans and frames kept
+    :return: The active profiler
+    """
+    global current
+    current = profiler(size)
+    return current
+
+
+def disable():
+    """
+    Function that stops recording.
+
+    :return: The profiler that was active (None if there was none)
+    """
+    global current
+    stopped, current = current, None
+    return stopped
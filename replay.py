@@ -0,0 +1,64 @@
+import argparse
+import os
+import random
+import time
+from console import console, null_sink, load_session
+from game import game
+from menu import menu
+
+
+def replay(path, pokemon_game, sink=None):
+    """
+    Function that replays a recorded session through the real game loop.
+
+    :param path: Session file path
+    :param pokemon_game: game to run the session in
+    :param sink: Stream that receives the output (discarded if None)
+    :return: Number of frames drawn
+    """
+    seed, inputs = load_session(path)
+    random.seed(seed)
+    menu.use_console(console(inputs, sink if sink is not None else null_sink()))
+    pokemon_game.loop()     # Raises EOFError if the session ends before the game does
+    return menu.display.frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions (main.py --record) as a load test.")
+    parser.add_argument('sessions', nargs='+', help="session files")
+    parser.add_argument('--repeat', type=int, default=1, help="times to replay every session")
+    parser.add_argument('--lines', type=int, default=50, help="terminal height to render for")
+    parser.add_argument('--output', help="write the rendered output of every session to this file")
+    args = parser.parse_args()
+
+    os.environ['LINES'] = str(args.lines)
+    pokemon_game = game()
+    output = open(args.output, 'w') if args.output else None
+    sink = output if output else null_sink()
+
+    frames = sessions = failed = 0
+    start = time.perf_counter()
+    try:
+        for _ in range(args.repeat):
+            for path in args.sessions:
+                try:
+                    frames += replay(path, pokemon_game, sink)
+                    sessions += 1
+                except EOFError:
+                    frames += menu.display.frames
+                    failed += 1
+                    print(f"Session '{path}' ended before the game did")
+    finally:
+        if output:
+            output.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"{sessions} sessions, {frames} frames in {elapsed:.2f}s "
+          f"({frames / elapsed:,.0f} frames/s, {sessions / elapsed:,.1f} sessions/s)")
+    if not args.output:
+        print(f"{sink.bytes:,} bytes written ({sink.bytes / max(frames, 1):,.0f} bytes/frame)")
+    if failed:
+        print(f"{failed} sessions failed")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import json
+import os
+import sqlite3
+from collections.abc import Mapping
+
+SCHEMA = """
+CREATE TABLE species (
+    number INTEGER PRIMARY KEY,     -- Position in the json file (0 based)
+    name TEXT NOT NULL UNIQUE,
+    lower_name TEXT NOT NULL UNIQUE,
+    hp INTEGER NOT NULL,
+    moves TEXT NOT NULL,            -- json object of move name -> damage
+    move_names TEXT NOT NULL        -- lowercase move names, one per line (for searching)
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+class roster(Mapping):
+    """
+    Indexed species store backed by SQLite, built from pokemon.json.
+    Behaves like the dict loaded from the json file (name -> stats), but only
+    reads the species that are asked for.
+    """
+    def __init__(self, json_path='pokemon.json', db_path=None):
+        """
+        Creates a roster. The database is (re)built when it is missing or older than the json file.
+
+        :param json_path: Path of the roster json file
+        :param db_path: Path of the SQLite index (json path with .db extension if None)
+        """
+        self.json_path = json_path
+        self.db_path = db_path if db_path is not None else os.path.splitext(json_path)[0] + '.db'
+        self.cache = {}         # Stats of species read so far
+        self.names = None       # Names in roster order (read when first needed)
+
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        if self.is_stale():
+            self.build()
+
+    def is_stale(self):
+        """
+        Function that checks if the database was built from the current json file.
+
+        :return: True if the database has to be rebuilt
+        """
+        try:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'mtime'").fetchone()
+        except sqlite3.OperationalError:
+            return True
+        return row is None or row[0] != str(os.stat(self.json_path).st_mtime_ns)
+
+    def build(self):
+        """Function that (re)builds the database from the json file."""
+        with open(self.json_path) as pokemon_data:
+            pokemons = json.load(pokemon_data)
+
+        with self.connection:
+            self.connection.executescript("DROP TABLE IF EXISTS species; DROP TABLE IF EXISTS meta;" + SCHEMA)
+            self.connection.executemany(
+                "INSERT INTO species VALUES (?, ?, ?, ?, ?, ?)",
+                ((number, name, name.lower(), stats['HP'], json.dumps(stats['moves']),
+                  "\n".join(stats['moves']).lower())
+                 for number, (name, stats) in enumerate(pokemons.items())))
+            self.connection.execute("INSERT INTO meta VALUES ('mtime', ?)",
+                                    (str(os.stat(self.json_path).st_mtime_ns),))
+        self.cache = {}
+        self.names = None
+
+    def __getitem__(self, name):
+        """
+        Function that gets the stats of a species.
+
+        :param name: Pokemon name
+        :return: Stats ({"HP": ..., "moves": {...}})
+        """
+        stats = self.cache.get(name)
+        if stats is None:
+            row = self.connection.execute("SELECT hp, moves FROM species WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                raise KeyError(name)
+            stats = self.cache[name] = {"HP": row[0], "moves": json.loads(row[1])}
+        return stats
+
+    def __iter__(self):
+        if self.names is None:
+            self.names = [name for name, in self.connection.execute("SELECT name FROM species ORDER BY number")]
+        return iter(self.names)
+
+    def __len__(self):
+        if self.names is not None:
+            return len(self.names)
+        return self.connection.execute("SELECT COUNT(*) FROM species").fetchone()[0]
+
+    def number(self, name):
+        """
+        Function that gets the number of a species.
+
+        :param name: Pokemon name (case insensitive)
+        :return: Number (position in the json file), None if not in the roster
+        """
+        row = self.connection.execute("SELECT number FROM species WHERE lower_name = ?", (name.lower(),)).fetchone()
+        return None if row is None else row[0]
+
+    def by_number(self, number):
+        """
+        Function that gets the name of a species by number.
+
+        :param number: Number (position in the json file)
+        :return: Pokemon name
+        """
+        row = self.connection.execute("SELECT name FROM species WHERE number = ?", (number,)).fetchone()
+        if row is None:
+            raise KeyError(number)
+        return row[0]
+
+    def search(self, text):
+        """
+        Function that finds species whose name or one of whose moves contains a text.
+
+        :param text: Text to search for (case insensitive)
+        :return: Matching names in roster order
+        """
+        escaped = text.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        pattern = f"%{escaped}%"
+        rows = self.connection.execute(
+            "SELECT name FROM species WHERE lower_name LIKE ? ESCAPE '\\' OR move_names LIKE ? ESCAPE '\\' "
+            "ORDER BY number", (pattern, pattern))
+        return [name for name, in rows]
@@ -0,0 +1,192 @@
+import os
+import sys
+from functools import lru_cache
+import ansi
+import palette
+import profiler
+from framebuffer import framebuffer
+
+CLEAR = '\x1b[H\x1b[2J'     # Move cursor home and clear the screen
+CLEAR_BELOW = '\x1b[J'      # Clear from cursor to end of screen
+
+
+def move(y, x):
+    """
+    Function that creates a cursor movement escape sequence.
+
+    :param y: Row (0 based)
+    :param x: Column (0 based)
+    :return: ANSI escape sequence
+    """
+    return f'\x1b[{y+1};{x+1}H'
+
+
+def terminal_lines():
+    """
+    Function that gets the height of the terminal like shutil.get_terminal_size
+    (shutil is slow to import): $LINES, else the size of the terminal on stdout, else 24.
+
+    :return: Number of lines
+    """
+    try:
+        lines = int(os.environ.get('LINES', 0))
+    except ValueError:
+        lines = 0
+    if lines > 0:
+        return lines
+    try:
+        return os.get_terminal_size(sys.__stdout__.fileno()).lines
+    except (AttributeError, ValueError, OSError):
+        return 24
+
+
+@lru_cache(maxsize=32)
+def parse(text, depth=24):
+    """
+    Function that parses a frame. Frames are immutable, so identical frames
+    (e.g. the same menu on many sessions' screens) share one framebuffer.
+    Frames for lower color depths are converted once and cached as well.
+
+    :param text: Frame as ANSI text
+    :param depth: Color depth (24, 256 or 16)
+    :return: framebuffer
+    """
+    if depth != 24:
+        return palette.reduce(parse(text), depth)
+    return framebuffer.from_lines(text.split('\n'))
+
+
+class screen:
+    """Screen compositor that only repaints cells that changed since the previous frame."""
+    def __init__(self, stream=None, gap=3, lines=None, depth=None):
+        """
+        Creates a screen.
+
+        :param stream: Writable text stream (sys.stdout if None)
+        :param gap: Unchanged cells between two changed runs that are repainted anyway
+                    (cheaper than a cursor move)
+        :param lines: Height of the terminal (asked from the local terminal if None)
+        :param depth: Color depth of the terminal, 24, 256 or 16 (detected from the environment if None)
+        """
+        self.stream = stream
+        self.gap = gap
+        self.lines = lines
+        self._depth = depth         # Detected on first use (see depth)
+        self.frame = None           # Frame currently on the terminal (None if unknown)
+        self.bytes_written = 0      # Bytes written over all frames
+        self.frames = 0             # Frames drawn
+
+    @property
+    def depth(self):
+        """Color depth of the terminal (detected from the environment when first needed)."""
+        if self._depth is None:
+            self._depth = palette.detect()
+        return self._depth
+
+    @depth.setter
+    def depth(self, depth):
+        self._depth = depth
+
+    def write(self, text):
+        """
+        Function that writes text to the stream in a single write.
+
+        :param text: Text to write
+        """
+        stream = self.stream if self.stream is not None else sys.stdout
+        stream.write(text)      # Profiled by the console (see console.write)
+        stream.flush()
+        self.bytes_written += len(text.encode())
+
+    def fits(self, frame):
+        """
+        Function that checks if a frame fits on the terminal together with the lines below it
+        (an error message, the input prompt and the line after pressing enter).
+        Frames that do not fit scroll, so their cells can not be addressed.
+
+        :param frame: framebuffer to draw
+        :return: True if the frame fits
+        """
+        lines = self.lines if self.lines is not None else terminal_lines()
+        return frame.height + 3 <= lines
+
+    def draw(self, text):
+        """
+        Function that draws a frame and leaves the cursor on the line below it.
+
+        :param text: Frame as ANSI text
+        """
+        with profiler.span('compose'):
+            frame = parse(text, self.depth)
+        self.draw_frame(frame, text)
+
+    def draw_frame(self, frame, text=None):
+        """
+        Function that draws a parsed frame and leaves the cursor on the line below it.
+
+        :param frame: framebuffer to draw
+        :param text: ANSI text of the frame if it was parsed for this screen's color depth
+                     (see draw), None if its colors still have to be converted
+        """
+        self.frames += 1
+        if text is None:
+            frame = palette.reduce(frame, self.depth)
+        if not self.fits(frame):
+            # Too tall to address, print it as scrolling text
+            self.frame = None
+            self.write((text if text is not None and self.depth == 24 else "\n".join(frame.lines)) + '\n')
+        else:
+            with profiler.span('compose'):
+                if self.frame is None:
+                    parts = [CLEAR] + [move(y, 0) + line for y, line in enumerate(frame.lines)]
+                else:
+                    parts = self.diff(self.frame, frame)
+                parts.append(move(frame.height, 0) + CLEAR_BELOW)
+                self.frame = frame
+                output = ''.join(parts)
+            self.write(output)
+        profiler.end_frame()
+
+    def diff(self, old, new):
+        """
+        Function that creates the output that turns one frame into another.
+        Colors are carried over from one changed run to the next (cursor moves keep them).
+
+        :param old: framebuffer on the terminal
+        :param new: framebuffer to draw
+        :return: List of output pieces (cursor moves and cell runs)
+        """
+        width = max(old.width, new.width)
+        old = old.pad(right=width - old.width)
+        new = new.pad(right=width - new.width)
+        parts = []
+        fg = bg = None
+        for y in range(new.height):
+            new_cells = new.cells(y)
+            if y >= old.height:
+                parts.append(move(y, 0))
+                fg, bg = ansi.emit_into(parts, new_cells, fg, bg)
+                continue
+            row = new.row_slice(y)
+            if (old.glyphs[row] == new.glyphs[row] and old.fg[row] == new.fg[row]
+                    and old.bg[row] == new.bg[row]):
+                continue
+            old_cells = old.cells(y)
+            changed = [x for x in range(width) if old_cells[x] != new_cells[x]]
+            # Group changed cells into runs, bridging small gaps
+            start = end = changed[0]
+            for x in changed[1:] + [None]:
+                if x is not None and x - end <= self.gap:
+                    end = x
+                    continue
+                parts.append(move(y, start))
+                fg, bg = ansi.emit_into(parts, new_cells[start:end+1], fg, bg)
+                if x is not None:
+                    start = end = x
+        if fg is not None or bg is not None:
+            parts.append(ansi.RESET)
+        return parts
+
+    def invalidate(self):
+        """Function that forgets the frame on the terminal (the next frame is drawn in full)."""
+        self.frame = None
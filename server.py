@@ -0,0 +1,253 @@
+import argparse
+import asyncio
+import os
+from console import console
+from screen import screen
+from game import game, ROSTER, MATCHUPS, SPRITE_CACHE
+from menu import FightMenu
+from sprite import registry
+from roster import roster
+from matchups import matchup_index
+
+
+class stream_sink:
+    """Writable text stream that queues text on an asyncio stream writer."""
+    __slots__ = ('writer',)
+
+    def __init__(self, writer):
+        """
+        Creates a stream sink.
+
+        :param writer: asyncio.StreamWriter of the connection
+        """
+        self.writer = writer
+
+    def write(self, text):
+        """
+        Function that queues text (sent when the session waits for input).
+
+        :param text: Text to send
+        :return: Number of characters written
+        """
+        self.writer.write(text.encode())
+        return len(text)
+
+    def flush(self):
+        """Function that does nothing (the session drains the writer before waiting)."""
+
+
+async def drive(steps, terminal, reader, writer):
+    """
+    Function that runs a step-wise menu interaction (see menu.select) on a connection.
+    Prompts are sent and answered by the next input line, other yielded values are
+    awaited (e.g. waiting for another player) and their results sent back.
+
+    :param steps: Generator yielding prompts or awaitables
+    :param terminal: console of the session
+    :param reader: asyncio.StreamReader of the connection
+    :param writer: asyncio.StreamWriter of the connection
+    :return: Result of the interaction
+    """
+    try:
+        request = next(steps)
+        while True:
+            if isinstance(request, str):
+                terminal.write(request)
+                await writer.drain()
+                line = await reader.readline()
+                if not line:
+                    raise EOFError("Connection closed")
+                reply = line.decode(errors='replace').rstrip('\r\n')
+            else:
+                await writer.drain()
+                reply = await request
+            request = steps.send(reply)
+    except StopIteration as stop:
+        return stop.value
+
+
+class duel:
+    """Player vs player battle shared by the sessions of both players."""
+    __slots__ = ('pokemons', 'turn', 'moves')
+
+    def __init__(self, first, second):
+        """
+        Creates a duel.
+
+        :param first: player moving first
+        :param second: Other player
+        """
+        self.pokemons = (first, second)
+        self.turn = 0                                       # Side that attacks next
+        self.moves = (asyncio.Queue(), asyncio.Queue())     # Attacks for each side to see (None if the other side left)
+
+    def over(self):
+        """
+        Function to check if the duel is over.
+
+        :return: True if a Pokemon fainted
+        """
+        return any(pokemon.hp == 0 for pokemon in self.pokemons)
+
+    def attack(self, side, attack):
+        """
+        Function that performs an attack and tells the other side.
+
+        :param side: Attacking side
+        :param attack: Attack name
+        """
+        attacker, attackee = self.pokemons[side], self.pokemons[1 - side]
+        attacker.attack(attack, attackee)
+        if attackee.hp < 0:
+            attackee.hp = 0
+        self.turn = 1 - side
+        self.moves[1 - side].put_nowait(attack)
+
+    def leave(self, side):
+        """
+        Function that lets a side leave; the other side wins if the duel was not over.
+
+        :param side: Leaving side
+        """
+        if not self.over():
+            self.moves[1 - side].put_nowait(None)
+
+
+class lobby:
+    """Pairs players who want to battle each other."""
+    def __init__(self):
+        """Creates a lobby."""
+        self.waiting = None     # (player, future of the duel) of the player waiting for an opponent
+
+    def duel(self, session, pokemon):
+        """
+        Function that finds an opponent and battles it (step-wise, see menu.select).
+
+        :param session: game of the player
+        :param pokemon: player to battle with
+        :return: (winner, bool for this player winning)
+        """
+        fight = session.attach(FightMenu())
+        if self.waiting is None:
+            match = asyncio.get_running_loop().create_future()
+            self.waiting = (pokemon, match)
+            fight.menu_content = [pokemon.get_sprite().text]
+            fight.dialog(["Waiting for an opponent..."])
+            fight.dialog.center(pokemon.sprite.width)
+            fight.render()
+            try:
+                battle = yield match
+            finally:
+                if self.waiting is not None and self.waiting[1] is match:
+                    self.waiting = None     # Left before an opponent came
+            side = 0
+        else:
+            opponent, match = self.waiting
+            self.waiting = None
+            battle = duel(opponent, pokemon)
+            match.set_result(battle)
+            side = 1
+
+        me, other = battle.pokemons[side], battle.pokemons[1 - side]
+        try:
+            while not battle.over():
+                fight.show_battle(me, other)
+                if battle.turn == side:
+                    attack = yield from fight.choose(me, can_change=False)
+                    battle.attack(side, attack)
+                    fight.show_battle(me, other)
+                    yield from fight.message(me, attack)
+                else:
+                    fight.dialog([f"Waiting for {other.name} to attack..."])
+                    fight.dialog.center(fight.width)
+                    fight.render()
+                    attack = yield battle.moves[side].get()
+                    if attack is None:
+                        return me, True     # The other player left
+                    fight.show_battle(me, other)
+                    yield from fight.message(other, attack)
+        finally:
+            battle.leave(side)
+        return (me, True) if other.hp == 0 else (other, False)
+
+
+class server:
+    """Game server running every connection as a session of the game."""
+    def __init__(self, pokemons, matchups, lines=50, depth=24):
+        """
+        Creates a server. Pokemons, matchups, sprites and rendered dialogs are shared by all sessions.
+
+        :param pokemons: Pokemons to play with (e.g. a roster)
+        :param matchups: matchup_index of the Pokemons
+        :param lines: Terminal height assumed for the clients
+        :param depth: Color depth assumed for the clients (24, 256 or 16)
+        """
+        self.pokemons = pokemons
+        self.matchups = matchups
+        self.lines = lines
+        self.depth = depth
+        self.lobby = lobby()
+        self.sessions = 0       # Connected sessions
+
+    async def handle(self, reader, writer):
+        """
+        Function that runs a session on a connection.
+
+        :param reader: asyncio.StreamReader of the connection
+        :param writer: asyncio.StreamWriter of the connection
+        """
+        terminal = console(sink=stream_sink(writer))
+        session = game(registry.cache_dir, pokemons=self.pokemons, matchups=self.matchups, terminal=terminal,
+                       display=screen(terminal, lines=self.lines, depth=self.depth), lobby=self.lobby)
+        steps = session.steps()
+        self.sessions += 1
+        try:
+            await drive(steps, terminal, reader, writer)
+            await writer.drain()
+        except (EOFError, ConnectionError):
+            pass
+        finally:
+            steps.close()   # Lets a duel in progress end by forfeit
+            self.sessions -= 1
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8023, path=None):
+        """
+        Function that accepts connections until cancelled.
+
+        :param host: TCP host
+        :param port: TCP port
+        :param path: Unix socket path (used instead of TCP if given)
+        """
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            listener = await asyncio.start_unix_server(self.handle, path)
+        else:
+            listener = await asyncio.start_server(self.handle, host, port)
+        async with listener:
+            await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host the Pokemon game for many players (connect with e.g. nc).")
+    parser.add_argument('--host', default='127.0.0.1', help="TCP host (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8023, help="TCP port (default 8023)")
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--lines', type=int, default=50, help="terminal height assumed for the clients")
+    parser.add_argument('--colors', type=int, choices=[24, 256, 16], default=24,
+                        help="color depth assumed for the clients (default 24-bit)")
+    args = parser.parse_args()
+
+    registry.cache_dir = SPRITE_CACHE
+    pokemons = roster(ROSTER)
+    game_server = server(pokemons, matchup_index.open(pokemons, MATCHUPS, ROSTER), args.lines, args.colors)
+    where = args.unix if args.unix else f"{args.host}:{args.port}"
+    print(f"Serving on {where}")
+    try:
+        asyncio.run(game_server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import random
+
+class species:
+    """Lightweight Pokemon stats used for headless battles (no sprite, no I/O)."""
+    __slots__ = ('name', 'hp', 'moves', 'damage', 'best')
+
+    def __init__(self, name, stats):
+        """
+        Creates a species from a pokemon.json roster entry.
+
+        :param name: Pokemon name
+        :param stats: Pokemon stats ({"HP": ..., "moves": {...}})
+        """
+        self.name = name                                # Pokemon name
+        self.hp = stats['HP']                           # Starting health
+        self.moves = tuple(stats['moves'].keys())       # Move names
+        self.damage = tuple(stats['moves'].values())    # Damage per move (same order as moves)
+        # Index of the strongest move (first one on ties)
+        self.best = max(range(len(self.damage)), key=self.damage.__getitem__) if self.damage else 0
+
+
+def random_policy(attacker, defender, attacker_hp, defender_hp, rng):
+    """
+    Policy that picks a move uniformly at random (same as enemy.attack).
+
+    :param attacker: species that is attacking
+    :param defender: species being attacked
+    :param attacker_hp: Current hp of the attacker
+    :param defender_hp: Current hp of the defender
+    :param rng: random.Random instance
+    :return: Index of the chosen move
+    """
+    return rng.randrange(len(attacker.damage))
+
+
+def greedy_policy(attacker, defender, attacker_hp, defender_hp, rng):
+    """
+    Policy that always picks the strongest move.
+
+    :param attacker: species that is attacking
+    :param defender: species being attacked
+    :param attacker_hp: Current hp of the attacker
+    :param defender_hp: Current hp of the defender
+    :param rng: random.Random instance (unused)
+    :return: Index of the chosen move
+    """
+    return attacker.best
+
+
+class battle_result:
+    """Outcome of a headless battle."""
+    __slots__ = ('winner', 'names', 'turns', 'hp', 'log')
+
+    def __init__(self, winner, names, turns, hp, log):
+        """
+        Creates a battle result.
+
+        :param winner: Index of the winning side (0 moves first, 1 second), None for a draw
+        :param names: Names of both sides
+        :param turns: Number of attacks performed
+        :param hp: Remaining hp of both sides
+        :param log: List of (side, move, damage, defender hp left) tuples, None if not logged
+        """
+        self.winner = winner
+        self.names = names
+        self.turns = turns
+        self.hp = hp
+        self.log = log
+
+    @property
+    def winner_name(self):
+        """Name of the winning Pokemon (None for a draw)."""
+        return None if self.winner is None else self.names[self.winner]
+
+    def __repr__(self):
+        return f"battle_result(winner={self.winner_name!r}, turns={self.turns}, hp={self.hp})"
+
+
+def simulate(first, second, first_policy=random_policy, second_policy=random_policy,
+             rng=None, log=True, max_turns=1000):
+    """
+    Function that runs a full battle without rendering or input.
+    Follows the FightMenu rules: sides alternate single attacks (first side starts)
+    and hp is clamped at 0, which ends the battle.
+
+    :param first: species that attacks first (the player in FightMenu)
+    :param second: species that attacks second (the enemy in FightMenu)
+    :param first_policy: Move policy of the first side
+    :param second_policy: Move policy of the second side
+    :param rng: random.Random instance used by the policies (new unseeded one if None)
+    :param log: bool for recording the damage log
+    :param max_turns: Attacks after which the battle is called a draw
+    :return: battle_result
+    """
+    if rng is None:
+        rng = random.Random()
+
+    fighters = (first, second)
+    policies = (first_policy, second_policy)
+    hp = [first.hp, second.hp]
+    damage_log = [] if log else None
+
+    side = 0
+    for turn in range(1, max_turns + 1):
+        attacker = fighters[side]
+        other = 1 - side
+        move = policies[side](attacker, fighters[other], hp[side], hp[other], rng)
+        damage = attacker.damage[move]
+
+        hp_left = hp[other] - damage
+        if hp_left < 0:
+            hp_left = 0
+        hp[other] = hp_left
+
+        if log:
+            damage_log.append((side, move, damage, hp_left))
+        if hp_left == 0:
+            return battle_result(side, (first.name, second.name), turn, tuple(hp), damage_log)
+        side = other
+
+    return battle_result(None, (first.name, second.name), max_turns, tuple(hp), damage_log)
+
+
+class simulator:
+    """Headless battle simulator over a roster (e.g. the contents of pokemon.json)."""
+    def __init__(self, pokemons):
+        """
+        Creates a simulator.
+
+        :param pokemons: Pokemons to simulate (name -> stats)
+        """
+        self.species = {name: species(name, stats) for name, stats in pokemons.items()}
+
+    def battle(self, first, second, first_policy=random_policy, second_policy=random_policy,
+               rng=None, log=True):
+        """
+        Function that runs a single battle between two roster entries.
+
+        :param first: Name of the Pokemon attacking first
+        :param second: Name of the Pokemon attacking second
+        :param first_policy: Move policy of the first side
+        :param second_policy: Move policy of the second side
+        :param rng: random.Random instance used by the policies
+        :param log: bool for recording the damage log
+        :return: battle_result
+        """
+        return simulate(self.species[first], self.species[second],
+                        first_policy, second_policy, rng, log)
+
+    def matchup(self, first, second, battles, first_policy=random_policy,
+                second_policy=random_policy, rng=None):
+        """
+        Function that runs many battles for one matchup and counts the results.
+
+        :param first: Name of the Pokemon attacking first
+        :param second: Name of the Pokemon attacking second
+        :param battles: Number of battles to run
+        :param first_policy: Move policy of the first side
+        :param second_policy: Move policy of the second side
+        :param rng: random.Random instance used by the policies
+        :return: [first wins, second wins, draws]
+        """
+        if rng is None:
+            rng = random.Random()
+        a, b = self.species[first], self.species[second]
+        counts = [0, 0, 0]
+        for _ in range(battles):
+            winner = simulate(a, b, first_policy, second_policy, rng, False).winner
+            counts[2 if winner is None else winner] += 1
+        return counts
@@ -0,0 +1,427 @@
+import argparse
+import json
+import os
+import struct
+import sys
+import threading
+from array import array
+from simulator import species
+
+MAGIC = b'PKPT'             # Policy table file signature
+VERSION = 1
+PROBABILITY_SCALE = 65535   # Win probabilities are stored as uint16 fixed point
+OPPONENTS = ('minimax', 'random')
+
+
+def turns_to_ko(hp, damage):
+    """
+    Function that calculates the number of hits needed to knock out a Pokemon.
+
+    :param hp: Remaining hp
+    :param damage: Damage per hit
+    :return: Number of hits (infinite for zero damage)
+    """
+    if hp <= 0:
+        return 0
+    if damage <= 0:
+        return float('inf')
+    return -(-hp // damage)
+
+
+class solver:
+    """
+    Game tree solver for one matchup. Every (mover hp, opponent hp) state is solved
+    bottom-up: attacks that do damage lead to states with less total hp, which are solved
+    before. Zero damage moves lead back to the same hp, those loops are resolved per state.
+    States whose outcome is certain are decided without looking at the moves.
+    The mover maximizes its win probability; the opponent either minimizes it
+    ('minimax') or picks its moves uniformly at random like enemy.attack ('random').
+    """
+    def __init__(self, mover, opponent, model='minimax'):
+        """
+        Creates a solver and solves the states up to the full hp of both species.
+
+        :param mover: species whose win probability is maximized
+        :param opponent: Opposing species
+        :param model: Opponent model, 'minimax' or 'random'
+        """
+        if model not in OPPONENTS:
+            raise ValueError(f"Unknown opponent model '{model}' (choose from {', '.join(OPPONENTS)})")
+        self.mover = mover
+        self.opponent = opponent
+        self.model = model
+        self.size = (0, 0)      # Solved states: mover hp < size[0] and opponent hp < size[1]
+        self.table = (array('d'), array('d'))   # Win probability of the mover per turn, row per mover hp
+        self.moves = array('B')                 # Best move of the mover per state (same layout)
+        self.max_damage = (max(mover.damage, default=0), max(opponent.damage, default=0))
+        self.min_damage = (min(mover.damage, default=0), min(opponent.damage, default=0))
+        self.solve(mover.hp, opponent.hp)
+
+    def solve(self, hp, opponent_hp):
+        """
+        Function that solves every state up to the given hp.
+        A side that keeps using zero damage moves can not win by it: when both sides only
+        stall the mover does not win, like a matchup where nobody can do damage.
+
+        :param hp: Highest mover hp
+        :param opponent_hp: Highest opponent hp
+        """
+        if hp < self.size[0] and opponent_hp < self.size[1]:
+            return
+        # Grow at least twofold, so states asked for one by one do not solve the table over and over
+        rows, columns = max(hp + 1, 2 * self.size[0]), max(opponent_hp + 1, 2 * self.size[1])
+        damage = self.mover.damage
+        moves = [hit for hit in damage if hit > 0]
+        stalls = len(moves) < len(damage)
+        hits = [hit for hit in self.opponent.damage if hit > 0]
+        misses = len(self.opponent.damage) - len(hits)
+        minimax = self.model == 'minimax'
+
+        # Hits each side needs at its strongest and weakest, per hp of the other side
+        inf = float('inf')
+        fastest = [turns_to_ko(other_hp, self.max_damage[0]) for other_hp in range(columns)]
+        slowest = [turns_to_ko(other_hp, self.min_damage[0]) for other_hp in range(columns)]
+        other_fastest = [turns_to_ko(hp, self.max_damage[1]) for hp in range(rows)]
+        other_slowest = [turns_to_ko(hp, self.min_damage[1]) for hp in range(rows)]
+
+        # State (hp, opponent hp) is at index hp * columns + opponent hp (row 0: mover knocked out)
+        moving, waiting = array('d', bytes(8 * rows * columns)), array('d', bytes(8 * rows * columns))
+        best = array('B', [self.mover.best]) * (rows * columns)     # Strongest move where all moves are as good
+        for hp in range(1, rows):
+            row = hp * columns
+            moving[row] = waiting[row] = 1.0                # Opponent knocked out
+            other_fast, other_slow = other_fastest[hp], other_slowest[hp]
+            for other_hp in range(1, columns):
+                index = row + other_hp
+                fast, slow = fastest[other_hp], slowest[other_hp]
+                if fast == other_fast == inf:
+                    continue        # Nobody can do damage, count as not winning
+                # Certain outcomes need no search: the side to move wins if it needs no more hits
+                certain = 1.0 if slow <= other_fast else 0.0 if fast > other_slow else None
+                certain_waiting = 0.0 if other_slow <= fast else 1.0 if other_fast > slow else None
+                if certain is not None and certain_waiting is not None:
+                    moving[index], waiting[index] = certain, certain_waiting
+                    continue
+
+                # Mover attacks (same mover hp, lower opponent hp: solved earlier in this row)
+                attack = max((waiting[row + max(0, other_hp - hit)] for hit in moves), default=0.0)
+                # Opponent attacks (lower mover hp: solved in an earlier row)
+                outcomes = [moving[max(0, hp - hit) * columns + other_hp] for hit in hits]
+                if stalls:
+                    # Waiting is only worth what the opponent does with its damaging moves
+                    if minimax:
+                        wait = min(outcomes) if outcomes and not misses else 0.0
+                    else:
+                        wait = sum(outcomes) / len(outcomes) if outcomes else 0.0
+                    attack = max(attack, wait)
+                moving[index] = attack
+                if minimax:
+                    waiting[index] = min(outcomes + [attack] * bool(misses))
+                else:
+                    waiting[index] = (sum(outcomes) + misses * attack) / len(self.opponent.damage)
+
+                if certain is None:
+                    # Best move: highest win probability, the strongest one among equally good moves
+                    move, value = 0, None
+                    for ind, hit in enumerate(damage):
+                        outcome = (waiting[row + max(0, other_hp - hit)], hit)
+                        if value is None or outcome > value:
+                            move, value = ind, outcome
+                    best[index] = move
+        self.size = (rows, columns)
+        self.table = (moving, waiting)
+        self.moves = best
+
+    def value(self, hp, opponent_hp, turn=0):
+        """
+        Function that calculates the win probability of the mover in a state.
+
+        :param hp: Mover hp
+        :param opponent_hp: Opponent hp
+        :param turn: 0 if the mover moves next, 1 if the opponent does
+        :return: Win probability of the mover
+        """
+        if opponent_hp <= 0:
+            return 1.0
+        if hp <= 0:
+            return 0.0
+        self.solve(hp, opponent_hp)
+        return self.table[turn][hp * self.size[1] + opponent_hp]
+
+    def best_move(self, hp, opponent_hp):
+        """
+        Function that finds the best move of the mover (the strongest one among equally good moves).
+
+        :param hp: Mover hp (above 0)
+        :param opponent_hp: Opponent hp (above 0)
+        :return: (move index, win probability)
+        """
+        self.solve(hp, opponent_hp)
+        index = hp * self.size[1] + opponent_hp
+        return self.moves[index], self.table[0][index]
+
+
+class policy_table:
+    """Precomputed best moves and win probabilities for every matchup and state."""
+    def __init__(self, model='minimax'):
+        """
+        Creates an empty policy table.
+
+        :param model: Opponent model the table was solved for
+        """
+        self.model = model
+        self.entries = {}   # (mover, opponent) -> (mover max hp, opponent max hp, moves, probabilities)
+
+    @classmethod
+    def build(cls, pokemons, model='minimax'):
+        """
+        Function that solves every ordered matchup for every hp state.
+
+        :param pokemons: Pokemons (name -> stats)
+        :param model: Opponent model, 'minimax' or 'random'
+        :return: policy_table
+        """
+        table = cls(model)
+        roster = [species(name, stats) for name, stats in pokemons.items()]
+        for mover in roster:
+            for opponent in roster:
+                table.add(solver(mover, opponent, model))
+        return table
+
+    def add(self, matchup):
+        """
+        Function that stores the best move of every state of a solved matchup.
+
+        :param matchup: solver of the matchup
+        """
+        mover_hp, opponent_hp = matchup.mover.hp, matchup.opponent.hp
+        moves = array('B', bytes((mover_hp + 1) * (opponent_hp + 1)))
+        probabilities = array('H', bytes(2 * len(moves)))
+        matchup.solve(mover_hp, opponent_hp)
+        stride = matchup.size[1]
+        # Copy row by row, the solver's rows may be longer (row and column 0 stay 0)
+        for hp in range(1, mover_hp + 1):
+            row, solved = hp * (opponent_hp + 1), hp * stride
+            moves[row + 1:row + opponent_hp + 1] = matchup.moves[solved + 1:solved + opponent_hp + 1]
+            probabilities[row + 1:row + opponent_hp + 1] = array('H', (
+                round(probability * PROBABILITY_SCALE) for probability in matchup.table[0][solved + 1:solved + opponent_hp + 1]))
+        self.entries[(matchup.mover.name, matchup.opponent.name)] = (mover_hp, opponent_hp, moves, probabilities)
+
+    def lookup(self, mover, opponent, hp, opponent_hp):
+        """
+        Function that looks up the best move in a state (O(1)).
+
+        :param mover: Name of the Pokemon to move
+        :param opponent: Name of the opposing Pokemon
+        :param hp: Mover hp
+        :param opponent_hp: Opponent hp
+        :return: (move index, win probability), None if the state is not in the table
+        """
+        entry = self.entries.get((mover, opponent))
+        if entry is None:
+            return None
+        mover_hp, max_opponent_hp, moves, probabilities = entry
+        if not (0 < hp <= mover_hp and 0 < opponent_hp <= max_opponent_hp):
+            return None
+        index = hp * (max_opponent_hp + 1) + opponent_hp
+        return moves[index], probabilities[index] / PROBABILITY_SCALE
+
+    def policy(self, attacker, defender, attacker_hp, defender_hp, rng):
+        """
+        Policy for the headless simulator that plays the table's best moves
+        (random moves for states outside of the table).
+
+        :param attacker: species that is attacking
+        :param defender: species being attacked
+        :param attacker_hp: Current hp of the attacker
+        :param defender_hp: Current hp of the defender
+        :param rng: random.Random instance
+        :return: Index of the chosen move
+        """
+        found = self.lookup(attacker.name, defender.name, attacker_hp, defender_hp)
+        return found[0] if found is not None else rng.randrange(len(attacker.damage))
+
+    def save(self, path):
+        """
+        Function that saves the table to a binary file.
+
+        :param path: File path
+        """
+        with open(path + '.tmp', 'wb') as table_file:
+            model = self.model.encode()
+            table_file.write(MAGIC + struct.pack('<HBI', VERSION, len(model), len(self.entries)) + model)
+            for (mover, opponent), (mover_hp, opponent_hp, moves, probabilities) in self.entries.items():
+                names = mover.encode(), opponent.encode()
+                table_file.write(struct.pack('<HHHH', len(names[0]), len(names[1]), mover_hp, opponent_hp))
+                table_file.write(names[0] + names[1])
+                table_file.write(moves.tobytes())
+                table_file.write(probabilities.tobytes())
+        os.replace(path + '.tmp', path)     # Never leave a half written table behind
+
+    @classmethod
+    def load(cls, path):
+        """
+        Function that loads a table from a binary file.
+
+        :param path: File path
+        :return: policy_table
+        """
+        with open(path, 'rb') as table_file:
+            data = table_file.read()
+        if data[:4] != MAGIC:
+            raise ValueError(f"'{path}' is not a policy table")
+        version, model_length, count = struct.unpack_from('<HBI', data, 4)
+        if version != VERSION:
+            raise ValueError(f"Unsupported policy table version {version} in '{path}'")
+        offset = 4 + struct.calcsize('<HBI')
+        table = cls(data[offset:offset + model_length].decode())
+        offset += model_length
+        for _ in range(count):
+            mover_length, opponent_length, mover_hp, opponent_hp = struct.unpack_from('<HHHH', data, offset)
+            offset += 8
+            mover = data[offset:offset + mover_length].decode()
+            offset += mover_length
+            opponent = data[offset:offset + opponent_length].decode()
+            offset += opponent_length
+            size = (mover_hp + 1) * (opponent_hp + 1)
+            moves = array('B', data[offset:offset + size])
+            offset += size
+            probabilities = array('H')
+            probabilities.frombytes(data[offset:offset + 2 * size])
+            if sys.byteorder != 'little':
+                probabilities.byteswap()
+            offset += 2 * size
+            table.entries[(mover, opponent)] = (mover_hp, opponent_hp, moves, probabilities)
+        return table
+
+
+class expert_policy:
+    """
+    Enemy policy that looks up its moves in a policy table. Without a table (e.g. while it
+    is built in the background, see build) the enemy plays its strongest moves.
+    """
+    def __init__(self, table=None):
+        """
+        Creates an expert policy.
+
+        :param table: policy_table (None until it is built)
+        """
+        self.table = table
+        self.builder = None     # Thread building the table (None if not building)
+
+    def build(self, pokemons, path, model='minimax'):
+        """
+        Function that builds the table in a background thread and saves it, so the game
+        does not wait for the solver. The table is used as soon as it is complete.
+
+        :param pokemons: Function returning the Pokemons to solve (called in the background thread)
+        :param path: File to save the table to
+        :param model: Opponent model, 'minimax' or 'random'
+        """
+        def build():
+            table = policy_table.build(pokemons(), model)
+            table.save(path)
+            self.table = table
+        self.builder = threading.Thread(target=build, daemon=True)
+        self.builder.start()
+
+    def __call__(self, attacker, attackee):
+        """
+        Function that picks the move of an enemy.
+
+        :param attacker: Attacking enemy
+        :param attackee: Pokemon being attacked
+        :return: Name of the move
+        """
+        moves = list(attacker.attacks.keys())
+        found = self.table.lookup(attacker.name, attackee.name, attacker.hp, attackee.hp) if self.table is not None else None
+        if found is None:
+            return max(moves, key=attacker.attacks.get)
+        return moves[found[0]]
+
+
+def iterate_values(mover, opponent, model, hp, opponent_hp):
+    """
+    Function that calculates the win probabilities of a matchup by repeating the game rules
+    on every state until nothing changes (slow reference for check).
+
+    :param mover: species whose win probability is maximized
+    :param opponent: Opposing species
+    :param model: Opponent model, 'minimax' or 'random'
+    :param hp: Highest mover hp
+    :param opponent_hp: Highest opponent hp
+    :return: Dictionary of (mover hp, opponent hp, turn) -> win probability
+    """
+    def get(values, hp, other_hp, turn):
+        return 1.0 if other_hp <= 0 else 0.0 if hp <= 0 else values[(hp, other_hp, turn)]
+
+    values = {(h, o, turn): 0.0 for h in range(1, hp + 1) for o in range(1, opponent_hp + 1) for turn in (0, 1)}
+    changed = True
+    while changed:
+        changed = False
+        for (h, o, turn), old in values.items():
+            if turn == 0:
+                new = max(get(values, h, o - damage, 1) for damage in mover.damage)
+            else:
+                outcomes = [get(values, h - damage, o, 0) for damage in opponent.damage]
+                new = min(outcomes) if model == 'minimax' else sum(outcomes) / len(outcomes)
+            if abs(new - old) > 1e-12:
+                values[(h, o, turn)] = new
+                changed = True
+    return values
+
+
+def check(hp=300):
+    """
+    Function that checks the solver on matchups with zero and one damage moves.
+
+    :param hp: HP of the species with a one damage move
+    :return: List of failure messages
+    """
+    growl = species('Growler', {'HP': 60, 'moves': {'Growl': 0, 'Tackle': 40}})
+    failures = []
+    for model in OPPONENTS:
+        matchup = solver(growl, growl, model)
+        for (h, o, turn), expected in iterate_values(growl, growl, model, 60, 60).items():
+            if abs(matchup.value(h, o, turn) - expected) > 1e-9:
+                failures.append(f"zero damage, {model}: state {(h, o, turn)} is {matchup.value(h, o, turn)}, not {expected}")
+
+    # Single move matchups are decided by who needs fewer hits
+    weak = species('Weak', {'HP': hp, 'moves': {'Poke': 1}})
+    strong = species('Strong', {'HP': hp, 'moves': {'Tackle': 40}})
+    for first, second in ((weak, strong), (strong, weak), (weak, weak)):
+        for model in OPPONENTS:
+            expected = float(turns_to_ko(second.hp, first.damage[0]) <= turns_to_ko(first.hp, second.damage[0]))
+            found = solver(first, second, model).value(first.hp, second.hp)
+            if found != expected:
+                failures.append(f"{first.name} vs {second.name}, {model}: {found}, not {expected}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve every matchup in pokemon.json and store the policy table.")
+    parser.add_argument('--roster', default='pokemon.json', help="roster json file")
+    parser.add_argument('--opponent', choices=OPPONENTS, default='minimax', help="opponent model")
+    parser.add_argument('--output', default='policy.bin', help="policy table file")
+    parser.add_argument('--check', action='store_true', help="only check the solver on zero and one damage moves")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check()
+        print("\n".join(failures) if failures else "Solver checks passed")
+        sys.exit(1 if failures else 0)
+
+    with open(args.roster) as pokemon_data:
+        pokemons = json.load(pokemon_data)
+    table = policy_table.build(pokemons, args.opponent)
+    table.save(args.output)
+
+    print(f"Solved {len(table.entries)} matchups ({args.opponent} opponent), saved to {args.output}")
+    names = list(pokemons)
+    for first in names:
+        chances = ", ".join(f"{second} {table.lookup(first, second, pokemons[first]['HP'], pokemons[second]['HP'])[1]:.0%}"
+                            for second in names)
+        print(f"{first} moving first: {chances}")
+
+if __name__ == '__main__':
+    main()
@@ -1,107 +1,235 @@
 import os
-import numpy as np
+import profiler
+from framebuffer import framebuffer
+
+SPRITE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sprites')
+SPRITE_PACK = SPRITE_DIR + '.pack'      # Compiled sprites (built with assets.py)
 
 class sprite:
     """Class for loading and displaying ANSI escape code sprites"""
-    def __init__(self,name=None, lines = None, spacing=0):
+    __slots__ = ('spacing', 'flipped', 'path', 'buffer')
+
+    def __init__(self,name=None, lines = None, spacing=0, buffer=None):
         """
         Creates a sprite.
 
         :param name: Name of sprite located in sprites folder
         :param lines: Lines of sprite
         :param spacing: Space before sprite
+        :param buffer: framebuffer of sprite (used as is, without spacing)
         """
         self.spacing = spacing      # Space before sprite
+        self.flipped = None         # Flipped sprite (computed once by flip)
+        self.path = None            # Path of sprite file
+        self.buffer = buffer if buffer is not None else framebuffer(0, 0)   # Sprite cells
 
         # sprite in sprites path
         if name != None:
-            self.path = f'sprites/{name.lower()}'
-            if self.load_path():
-                self.render()
+            self.path = os.path.join(SPRITE_DIR, name.lower())
+            lines = self.load_path()
 
         # sprite's lines in lines parameter
         if lines != None:
-            self.lines = lines
-            self.render()
+            self.render(lines)
 
     def load_path(self):
         """
         Function that loads the path of sprite.
 
-        :return: True if loaded succesfully, false otherwise
+        :return: Lines of sprite if loaded succesfully, None otherwise
         """
         if os.path.exists(self.path):
             with open(self.path) as sprite_file:
-                self.lines = sprite_file.read().split('\n')
-            return True
+                return sprite_file.read().split('\n')
         else:
             print(f"Sprite '{os.path.split(self.path)[-1]}' not found")
-            return False
-    
-    def render(self):
-        """Function that renders an ANSI sprite given it's lines."""
+            return None
 
-        # Calculate sprite width
-        self.width = 0
-        for line in self.lines:
-            line_len = line.count('▀') + line.count('▄') + line.count(' ')
-            if (line_len > self.width ):
-                self.width  = line_len + self.spacing
+    def render(self, lines):
+        """
+        Function that renders an ANSI sprite given it's lines.
+
+        :param lines: Lines of sprite
+        """
+        # Add spaces before each line and pad lines to the same width (so it is flippable)
+        self.buffer = framebuffer.from_lines(lines).pad(left=self.spacing)
 
-        # Add spaces before and after each line (so it is flippable)
-        for ind,line in enumerate(self.lines):
-            line = ' '*self.spacing + line
-            if len(line) < self.width:
-                line = line + ' '*(self.width-len(line))
-            self.lines[ind] = line
+    @property
+    def width(self):
+        """Sprite width in cells."""
+        return self.buffer.width
 
-        self.text = "\n".join(self.lines) + "\n"    # Sprite represented in text
+    @property
+    def lines(self):
+        """Lines of sprite (created when first needed)."""
+        return self.buffer.lines
 
+    @property
+    def text(self):
+        """Sprite represented in text."""
+        return self.buffer.text
 
     def flip(self):
-        """Function that flip the current sprite forizontally."""
-        flipped_lines = self.lines.copy()
-        for ind,t in enumerate(self.lines):
-            t = t.replace("\x1b",' ')
-            t = t.split(" ")
-            
-            indices = np.where(np.array(t) == '[0m')[0]
+        """
+        Function that flip the current sprite forizontally.
+        The flipped sprite is computed once and reused on later calls.
 
-            for i in indices:
-                temp = t[i]
-                t[i] = t[i-2]
-                t[i-2] = temp
+        :return: Flipped sprite
+        """
+        if self.flipped is None:
+            self.flipped = sprite(buffer=self.buffer.flip(), spacing=self.spacing)
+            self.flipped.flipped = self     # Flipping back gives the original
+        return self.flipped
 
-            flipped_lines[ind] = ''.join(["\x1b"+c if c.startswith('[') else " "+c for c in t[::-1]] )
-        return sprite(lines = flipped_lines,spacing=self.spacing)
+    def add_lines(self, lines, spacing=0):
+        """
+        Function that creates a sprite with lines of text added below the current sprite.
 
+        :param lines: Lines of text to add
+        :param spacing: Space before the new sprite
+        :return: New sprite
+        """
+        buffer = self.buffer.append_lines(lines).pad(left=spacing)
+        return sprite(buffer=buffer, spacing=spacing)
 
     def join(self, sprite2, spacing):
         """
         Function that puts 2 sprites next to each other.
+        The shorter sprite gets empty lines above it (so sprites are on same level).
 
         :param sprite2: Sprite to put ont the right of current sprite
         :param spacing: Spacing in between sprites
         :return: Joined sprites as one Sprite
         """
-        sprite1_lines = self.lines
-        sprite2_lines = sprite2.lines
-        len1 = len(sprite1_lines)
-        len2 = len(sprite2_lines)
-
-        # Add empty lines above shorter sprite (so sprites are on same level)
-        if len1 > len2:
-            lines_to_add = (len1-len2)
-            sprite2_lines = [" " * (sprite2.width)] * lines_to_add + sprite2_lines
-        elif len2 > len1:
-            lines_to_add = (len2-len1)
-            sprite1_lines = [" " * (self.width)] * lines_to_add + sprite1_lines
-
-        joined_lines = [sprite1_lines[i] + " "*spacing + sprite2_lines[i] for i in range(len(sprite1_lines))]
-        joined_sprite = sprite(lines=joined_lines)
-        return(joined_sprite)
-            
-    
+        return sprite(buffer=self.buffer.join(sprite2.buffer, spacing))
+
     def show(self):
         """Function that shows current sprite."""
         print(self.text)
+
+
+class sprite_registry:
+    """Process-wide store of loaded sprites, shared between menus and game restarts."""
+    def __init__(self, cache_dir=None, pack=None):
+        """
+        Creates a sprite registry.
+
+        :param cache_dir: Folder for the on-disk cache of flipped sprites (no disk cache if None)
+        :param pack: Path of a compiled sprite pack to load sprites from (sprite files only if None or missing)
+        """
+        self.cache_dir = cache_dir      # On-disk cache folder
+        self.pack_path = pack           # Sprite pack path
+        self.pack = None                # Opened sprite pack (False if there is none)
+        self.sprites = {}               # Loaded sprites by lowercase name
+
+    def get(self, name, flipped=False):
+        """
+        Function that returns the shared sprite with the given name,
+        loading (and flipping) it only the first time.
+        Shared sprites must not be modified, use sprite(lines=...) for variations.
+
+        :param name: Name of sprite located in sprites folder
+        :param flipped: bool for returning the horizontally flipped sprite
+        :return: Shared sprite
+        """
+        key = name.lower()
+        loaded = self.sprites.get(key)
+        if loaded is None:
+            with profiler.span('load'):
+                loaded = self.unpack(key)
+                if loaded is None:
+                    loaded = sprite(name)
+                self.sprites[key] = loaded
+
+        if not flipped or loaded.flipped is not None:
+            return loaded.flipped if flipped else loaded
+        with profiler.span('load'):
+            lines = self.load_flipped(loaded)
+            if lines is None:
+                loaded.flip()
+                self.save_flipped(loaded)
+            else:
+                loaded.flipped = sprite(buffer=framebuffer.from_lines(lines), spacing=loaded.spacing)
+                loaded.flipped.flipped = loaded     # Flipping back gives the original
+        return loaded.flipped
+
+    def unpack(self, key):
+        """
+        Function that loads a sprite (and its flipped sprite) from the sprite pack.
+
+        :param key: Lowercase sprite name
+        :return: Loaded sprite, None if it is not packed or its sprite file changed since
+        """
+        if self.pack is None:
+            self.pack = False
+            if self.pack_path is not None and os.path.exists(self.pack_path):
+                from assets import sprite_pack     # Imported on first use (no mmap without a pack)
+                try:
+                    self.pack = sprite_pack(self.pack_path)
+                except ValueError:
+                    pass    # Old or broken pack, load sprite files
+        if not self.pack or key not in self.pack or not self.pack.is_current(key):
+            return None
+        loaded = sprite(buffer=self.pack.buffer(key))
+        loaded.path = os.path.join(SPRITE_DIR, key)
+        loaded.flipped = sprite(buffer=self.pack.buffer(key, flipped=True))
+        loaded.flipped.flipped = loaded
+        return loaded
+
+    def cache_path(self, loaded):
+        """
+        Function that gets the on-disk cache path of a flipped sprite.
+
+        :param loaded: Loaded (unflipped) sprite
+        :return: Cache path, None if disk caching is disabled
+        """
+        if self.cache_dir is None or loaded.path is None:
+            return None
+        return os.path.join(self.cache_dir, os.path.basename(loaded.path) + '.flipped')
+
+    def source_mtime(self, loaded):
+        """
+        Function that gets the modification time of a sprite's file, which cache entries are made from.
+
+        :param loaded: Loaded (unflipped) sprite
+        :return: mtime in nanoseconds as text, None if the sprite file is missing (nothing to cache)
+        """
+        try:
+            return str(os.stat(loaded.path).st_mtime_ns)
+        except OSError:
+            return None
+
+    def load_flipped(self, loaded):
+        """
+        Function that loads a flipped sprite from the on-disk cache.
+        The cache entry is only used if it was made from the current sprite file (same mtime),
+        sprites without a file are never cached.
+
+        :param loaded: Loaded (unflipped) sprite
+        :return: Flipped lines, None if not cached or outdated
+        """
+        path = self.cache_path(loaded)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path) as cache_file:
+            mtime, _, text = cache_file.read().partition('\n')
+        if mtime != self.source_mtime(loaded):
+            return None
+        return text.split('\n')
+
+    def save_flipped(self, loaded):
+        """
+        Function that stores a flipped sprite in the on-disk cache.
+
+        :param loaded: Loaded (unflipped) sprite with its flipped sprite
+        """
+        path = self.cache_path(loaded)
+        mtime = self.source_mtime(loaded)
+        if path is None or mtime is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(path, 'w') as cache_file:
+            cache_file.write(f"{mtime}\n" + "\n".join(loaded.flipped.lines))
+
+
+registry = sprite_registry(pack=SPRITE_PACK)    # Shared sprite registry
@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import multiprocessing
+import os
+import numpy as np
+from PIL import Image
+from sprite import SPRITE_DIR, SPRITE_PACK
+
+VERSION = 1             # Converter version (part of the cache key, bump when the output changes)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sprite_import_cache')
+EXTENSIONS = ('.png',)
+RESET = '\x1b[0m'
+
+
+def load_rgba(path):
+    """
+    Function that loads an image as RGBA pixels.
+
+    :param path: Image path
+    :return: uint8 array of shape (height, width, 4)
+    """
+    with Image.open(path) as image:
+        return np.asarray(image.convert('RGBA'))
+
+
+def crop(pixels, threshold=128):
+    """
+    Function that crops the transparent border of an image.
+
+    :param pixels: RGBA pixels
+    :param threshold: Lowest alpha of a visible pixel
+    :return: Cropped RGBA pixels (0 x 0 if nothing is visible)
+    """
+    visible = pixels[..., 3] >= threshold
+    rows = np.flatnonzero(visible.any(axis=1))
+    columns = np.flatnonzero(visible.any(axis=0))
+    if rows.size == 0:
+        return pixels[:0, :0]
+    return pixels[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1]
+
+
+def downscale(pixels, factor):
+    """
+    Function that shrinks an image by averaging blocks of factor x factor pixels.
+    Colors are weighted by alpha, so transparent pixels do not darken the edges.
+
+    :param pixels: RGBA pixels
+    :param factor: Pixels per block along each axis
+    :return: Downscaled RGBA pixels
+    """
+    if factor == 1:
+        return pixels
+    height, width = pixels.shape[:2]
+    # Pad with transparent pixels to whole blocks
+    padded = np.zeros((-(-height // factor) * factor, -(-width // factor) * factor, 4), dtype=np.float32)
+    padded[:height, :width] = pixels
+    blocks = padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor, 4)
+    alpha = blocks[..., 3:].sum(axis=(1, 3))
+    color = (blocks[..., :3] * blocks[..., 3:]).sum(axis=(1, 3)) / np.maximum(alpha, 1)
+    result = np.concatenate([color, alpha / (factor * factor)], axis=-1)
+    return np.rint(result).astype(np.uint8)
+
+
+def to_ansi(pixels, threshold=128):
+    """
+    Function that converts an image to half-block ANSI text (two pixel rows per line),
+    in the format of the files in the sprites folder: '▀' with the top pixel as
+    foreground and the bottom pixel as background, '▄' or '▀' for a single visible pixel.
+
+    :param pixels: RGBA pixels
+    :param threshold: Lowest alpha of a visible pixel
+    :return: Lines of ANSI text
+    """
+    if pixels.shape[0] % 2:
+        pixels = np.concatenate([pixels, np.zeros((1,) + pixels.shape[1:], dtype=pixels.dtype)])
+    top, bottom = pixels[0::2], pixels[1::2]
+    # Cell kind: 0 empty, 1 top pixel only, 2 bottom pixel only, 3 both
+    kinds = ((top[..., 3] >= threshold).astype(np.uint8) | ((bottom[..., 3] >= threshold) << 1)).tolist()
+    top_colors = np.char.add(np.char.add(np.char.add(top[..., 0].astype(str), ';'),
+                                         np.char.add(top[..., 1].astype(str), ';')),
+                             top[..., 2].astype(str)).tolist()
+    bottom_colors = np.char.add(np.char.add(np.char.add(bottom[..., 0].astype(str), ';'),
+                                            np.char.add(bottom[..., 1].astype(str), ';')),
+                                bottom[..., 2].astype(str)).tolist()
+
+    lines = []
+    for kind_row, top_row, bottom_row in zip(kinds, top_colors, bottom_colors):
+        while kind_row and kind_row[-1] == 0:
+            kind_row.pop()      # Trailing empty cells (framebuffer pads rows again)
+        cells = []
+        for kind, top_color, bottom_color in zip(kind_row, top_row, bottom_row):
+            if kind == 0:
+                cells.append(' ')
+            elif kind == 1:
+                cells.append(f'\x1b[38;2;{top_color}m▀')
+            elif kind == 2:
+                cells.append(f'\x1b[38;2;{bottom_color}m▄')
+            else:
+                cells.append(f'\x1b[38;2;{top_color}m\x1b[48;2;{bottom_color}m▀{RESET}')
+        if kind_row and kind_row[-1] != 3:
+            cells.append(RESET)
+        lines.append(''.join(cells))
+    return lines
+
+
+def convert(path, max_width=64, threshold=128):
+    """
+    Function that converts an image file to a sprite.
+
+    :param path: Image path
+    :param max_width: Widest sprite in cells (larger images are downscaled)
+    :param threshold: Lowest alpha of a visible pixel
+    :return: Sprite as ANSI text
+    """
+    pixels = crop(load_rgba(path), threshold)
+    factor = max(1, -(-pixels.shape[1] // max_width))
+    return '\n'.join(to_ansi(downscale(pixels, factor), threshold))
+
+
+def convert_job(job):
+    """
+    Function that converts one image in a worker process.
+
+    :param job: (image path, cache key, max width, alpha threshold)
+    :return: (cache key, sprite text)
+    """
+    path, key, max_width, threshold = job
+    return key, convert(path, max_width, threshold)
+
+
+def cache_key(data, max_width, threshold):
+    """
+    Function that gets the cache key of an image conversion.
+
+    :param data: Image file content
+    :param max_width: Widest sprite in cells
+    :param threshold: Lowest alpha of a visible pixel
+    :return: Hex digest
+    """
+    digest = hashlib.blake2b(data, digest_size=16)
+    digest.update(f"{VERSION}:{max_width}:{threshold}".encode())
+    return digest.hexdigest()
+
+
+def import_images(source, output=SPRITE_DIR, cache_dir=CACHE_DIR, max_width=64, threshold=128, workers=None):
+    """
+    Function that converts a folder of images to sprites. Conversions are cached by image
+    content, so only new or changed images are converted (across a process pool).
+    Sprites are named after the lowercase image name without extension.
+
+    :param source: Folder with images
+    :param output: Folder to write the sprites to
+    :param cache_dir: Folder of the conversion cache
+    :param max_width: Widest sprite in cells
+    :param threshold: Lowest alpha of a visible pixel
+    :param workers: Number of worker processes (cpu count if None, inline if 1)
+    :return: Dictionary with the number of images 'converted', taken from the 'cached' conversions and 'written'
+    """
+    images = sorted(name for name in os.listdir(source) if name.lower().endswith(EXTENSIONS))
+    os.makedirs(cache_dir, exist_ok=True)
+    os.makedirs(output, exist_ok=True)
+
+    keys, jobs = {}, []
+    for name in images:
+        path = os.path.join(source, name)
+        with open(path, 'rb') as image_file:
+            key = cache_key(image_file.read(), max_width, threshold)
+        keys[name] = key
+        if not os.path.exists(os.path.join(cache_dir, key)):
+            jobs.append((path, key, max_width, threshold))
+    jobs = list({job[1]: job for job in jobs}.values())     # Identical images are converted once
+
+    workers = min(workers or multiprocessing.cpu_count(), len(jobs))
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        if pool is None:
+            results = map(convert_job, jobs)
+        else:
+            results = pool.imap_unordered(convert_job, jobs, chunksize=max(1, len(jobs) // (4 * workers)))
+        for key, text in results:
+            cache_path = os.path.join(cache_dir, key)
+            with open(cache_path + '.tmp', 'w') as cache_file:
+                cache_file.write(text)
+            os.replace(cache_path + '.tmp', cache_path)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    written = 0
+    for name, key in keys.items():
+        with open(os.path.join(cache_dir, key)) as cache_file:
+            text = cache_file.read()
+        sprite_path = os.path.join(output, os.path.splitext(name)[0].lower())
+        # Unchanged sprites keep their mtime (so sprite caches and packs stay valid)
+        if os.path.exists(sprite_path):
+            with open(sprite_path) as sprite_file:
+                if sprite_file.read() == text:
+                    continue
+        with open(sprite_path, 'w') as sprite_file:
+            sprite_file.write(text)
+        written += 1
+    return {'converted': len(jobs), 'cached': len(images) - len(jobs), 'written': written}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a folder of PNG images to ANSI sprites.")
+    parser.add_argument('source', help="folder with PNG images")
+    parser.add_argument('--output', default=SPRITE_DIR, help="sprites folder")
+    parser.add_argument('--cache', default=CACHE_DIR, help="conversion cache folder")
+    parser.add_argument('--width', type=int, default=64, help="widest sprite in cells (default 64)")
+    parser.add_argument('--threshold', type=int, default=128, help="lowest alpha of a visible pixel (default 128)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: cpu count)")
+    parser.add_argument('--pack', action='store_true', help="rebuild the sprite pack afterwards (see assets.py)")
+    args = parser.parse_args()
+
+    counts = import_images(args.source, args.output, args.cache, args.width, args.threshold, args.workers)
+    print(f"{counts['converted']} converted, {counts['cached']} cached, {counts['written']} sprites written to {args.output}")
+    if args.pack:
+        from assets import compile_pack
+        print(f"Packed {compile_pack(args.output, SPRITE_PACK)} sprites into {SPRITE_PACK}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import struct
+from collections import namedtuple
+
+MAGIC = b'PKST'
+VERSION = 1
+HEADER = struct.Struct('<HHI')          # Version, name count, state count
+STATE = struct.Struct('<HHHHBIH')       # Player, player hp, enemy, enemy hp, player turn, turn, bench size
+BENCH = struct.Struct('<HH')            # Pokemon, hp
+
+
+class battle_state(namedtuple('battle_state', 'player player_hp enemy enemy_hp bench player_turn turn')):
+    """
+    Immutable battle state without sprites: species names (shared with the roster), HP and turn.
+    Changes give new states that share the unchanged parts, so keeping a state is a snapshot.
+
+    player: Name of the player's Pokemon in battle
+    player_hp: HP of the player's Pokemon
+    enemy: Name of the enemy
+    enemy_hp: HP of the enemy
+    bench: Tuple of (name, hp) of the player's other Pokemons that lost HP, sorted by name
+    player_turn: bool for the player attacking next
+    turn: Attacks made
+    """
+    __slots__ = ()
+
+    @classmethod
+    def capture(cls, Player, Enemy, team, pokemons, player_turn, turn, previous=None):
+        """
+        Function that takes a snapshot of a battle between Pokemon objects.
+
+        :param Player: Player's Pokemon in battle
+        :param Enemy: Enemy
+        :param team: Player's Pokemons created so far (name -> player, e.g. SelectionMenu.created)
+        :param pokemons: Pokemon stats (name -> stats)
+        :param player_turn: bool for the player attacking next
+        :param turn: Attacks made
+        :param previous: Previous state (its bench is shared if it did not change)
+        :return: battle_state
+        """
+        bench = tuple(sorted((name, pokemon.hp) for name, pokemon in team.items()
+                             if name != Player.name and pokemon.hp != pokemons[name]['HP']))
+        if previous is not None and bench == previous.bench:
+            bench = previous.bench
+        return cls(Player.name, Player.hp, Enemy.name, Enemy.hp, bench, player_turn, turn)
+
+    @property
+    def over(self):
+        """bool for the battle having ended."""
+        return self.player_hp == 0 or self.enemy_hp == 0
+
+    def attack(self, damage):
+        """
+        Function that gets the state after the side whose turn it is attacks.
+
+        :param damage: Damage of the attack
+        :return: New battle_state
+        """
+        if self.player_turn:
+            return self._replace(enemy_hp=max(0, self.enemy_hp - damage), player_turn=False, turn=self.turn + 1)
+        return self._replace(player_hp=max(0, self.player_hp - damage), player_turn=True, turn=self.turn + 1)
+
+    def swap(self, name, full_hp):
+        """
+        Function that gets the state after the player changes Pokemon.
+
+        :param name: Name of the Pokemon to send in
+        :param full_hp: HP of that Pokemon if it did not lose any yet
+        :return: New battle_state
+        """
+        bench = dict(self.bench)
+        hp = bench.pop(name, full_hp)
+        bench[self.player] = self.player_hp
+        return self._replace(player=name, player_hp=hp, bench=tuple(sorted(bench.items())))
+
+
+class timeline:
+    """Persistent history of battle states; forks share their past and undo is O(1)."""
+    __slots__ = ('state', 'previous', 'length')
+
+    def __init__(self, state, previous=None):
+        """
+        Creates a timeline ending with a state.
+
+        :param state: Latest battle_state
+        :param previous: timeline before the state (None if it is the first)
+        """
+        self.state = state
+        self.previous = previous
+        self.length = 1 if previous is None else previous.length + 1
+
+    def push(self, state):
+        """
+        Function that adds a state.
+
+        :param state: battle_state
+        :return: New timeline (this one is unchanged)
+        """
+        return timeline(state, self)
+
+    def undo(self):
+        """
+        Function that goes back one state (the first state is kept).
+
+        :return: timeline without the latest state
+        """
+        return self.previous if self.previous is not None else self
+
+    def states(self):
+        """
+        Function that gets all states.
+
+        :return: List of battle_states, oldest first
+        """
+        states, node = [], self
+        while node is not None:
+            states.append(node.state)
+            node = node.previous
+        return states[::-1]
+
+    @classmethod
+    def from_states(cls, states):
+        """
+        Function that creates a timeline out of states.
+
+        :param states: battle_states, oldest first (at least one)
+        :return: timeline
+        """
+        node = None
+        for state in states:
+            node = timeline(state, node)
+        return node
+
+    def save(self, path):
+        """
+        Function that saves the timeline to a binary file.
+        Names are stored once, states refer to them by index.
+
+        :param path: Save file path
+        """
+        states = self.states()
+        names = {}
+        for state in states:
+            for name in (state.player, state.enemy, *(name for name, _ in state.bench)):
+                names.setdefault(name, len(names))
+        parts = [MAGIC, HEADER.pack(VERSION, len(names), len(states))]
+        for name in names:
+            encoded = name.encode()
+            parts.append(struct.pack('<B', len(encoded)) + encoded)
+        for state in states:
+            parts.append(STATE.pack(names[state.player], state.player_hp, names[state.enemy], state.enemy_hp,
+                                    state.player_turn, state.turn, len(state.bench)))
+            parts += [BENCH.pack(names[name], hp) for name, hp in state.bench]
+        with open(path, 'wb') as save_file:
+            save_file.write(b''.join(parts))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Function that loads a timeline saved with save.
+
+        :param path: Save file path
+        :return: timeline
+        """
+        with open(path, 'rb') as save_file:
+            data = save_file.read()
+        if data[:4] != MAGIC:
+            raise ValueError(f"'{path}' is not a battle save file")
+        version, name_count, state_count = HEADER.unpack_from(data, 4)
+        if version != VERSION:
+            raise ValueError(f"Unsupported battle save version {version} in '{path}'")
+        offset = 4 + HEADER.size
+        names = []
+        for _ in range(name_count):
+            length = data[offset]
+            names.append(data[offset + 1:offset + 1 + length].decode())
+            offset += 1 + length
+
+        node = None
+        for _ in range(state_count):
+            player, player_hp, enemy, enemy_hp, player_turn, turn, bench_size = STATE.unpack_from(data, offset)
+            offset += STATE.size
+            bench = tuple((names[name], hp) for name, hp in BENCH.iter_unpack(data[offset:offset + bench_size * BENCH.size]))
+            offset += bench_size * BENCH.size
+            if node is not None and bench == node.state.bench:
+                bench = node.state.bench
+            node = timeline(battle_state(names[player], player_hp, names[enemy], enemy_hp, bench, bool(player_turn), turn), node)
+        if node is None:
+            raise ValueError(f"'{path}' has no battle states")
+        return node
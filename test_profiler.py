@@ -0,0 +1,26 @@
+import random
+import profiler
+from console import console, null_sink
+from game import game
+
+
+def test_profiled_write_bytes_match_written_bytes():
+    """The bytes of the write spans are the bytes that reached the terminal, counted once."""
+    random.seed(0)
+    sink = null_sink()
+    # Play, pick the first Pokemon and enemy, attack until the battle ends, then exit
+    terminal = console(iter(['0', '0', '0'] + ['0'] * 60 + ['1']), sink)
+    session = game(sprite_cache=None, terminal=terminal)
+    active = profiler.enable()
+    try:
+        session.loop()
+    except EOFError:
+        pass
+    finally:
+        profiler.disable()
+
+    summary = active.summary()
+    assert summary['totals']['write']['bytes'] == sink.bytes
+    assert sum(frame['bytes'] for frame in summary['frames']) <= sink.bytes
+    for frame in summary['frames']:
+        assert frame['phases'].get('write', 0) <= frame['duration_ms']
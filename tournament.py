@@ -0,0 +1,192 @@
+import argparse
+import json
+import multiprocessing
+import random
+from simulator import simulator, random_policy, greedy_policy
+
+POLICIES = {'random': random_policy, 'greedy': greedy_policy}
+
+_simulator = None   # Simulator of the current worker process
+
+
+def init_worker(pokemons):
+    """
+    Function that creates the simulator of a worker process.
+
+    :param pokemons: Pokemons to simulate (name -> stats)
+    """
+    global _simulator
+    _simulator = simulator(pokemons)
+
+
+def run_shard(shard):
+    """
+    Function that runs one shard of battles with its own seed.
+
+    :param shard: (seed, shard index, first, second, battles, policy names)
+    :return: [first wins, second wins, draws]
+    """
+    seed, index, first, second, battles, policies = shard
+    rng = random.Random(f"{seed}:{index}")     # Independent of which worker runs the shard
+    return _simulator.matchup(first, second, battles,
+                              POLICIES[policies[0]], POLICIES[policies[1]], rng)
+
+
+class tournament:
+    """Tournament over every species, sharded across a process pool."""
+    def __init__(self, pokemons, battles=1000, shard_size=1000, policies=('random', 'random'),
+                 seed=0, workers=None):
+        """
+        Creates a tournament.
+
+        :param pokemons: Pokemons taking part (name -> stats)
+        :param battles: Battles per ordered matchup
+        :param shard_size: Maximum battles per shard (unit of work with its own seed)
+        :param policies: Policy names of the side attacking first and second
+        :param seed: Base seed, shard seeds are derived from it
+        :param workers: Number of worker processes (cpu count if None, inline if 1)
+        """
+        self.pokemons = pokemons
+        self.names = list(pokemons.keys())
+        self.battles = battles
+        self.shard_size = shard_size
+        self.policies = tuple(policies)
+        self.seed = seed
+        self.workers = workers or multiprocessing.cpu_count()
+        self.shards_run = 0     # Shards run so far (keeps seeds unique over rounds)
+
+    def play(self, matchups):
+        """
+        Function that plays every matchup and sums the results.
+
+        :param matchups: List of (first, second) name pairs
+        :return: List of [first wins, second wins, draws] per matchup
+        """
+        shards, owners = [], []
+        for ind, (first, second) in enumerate(matchups):
+            for start in range(0, self.battles, self.shard_size):
+                battles = min(self.shard_size, self.battles - start)
+                shards.append((self.seed, self.shards_run, first, second, battles, self.policies))
+                owners.append(ind)
+                self.shards_run += 1
+
+        if self.workers == 1:
+            init_worker(self.pokemons)
+            counts = list(map(run_shard, shards))
+        else:
+            with multiprocessing.Pool(self.workers, init_worker, (self.pokemons,)) as pool:
+                counts = pool.map(run_shard, shards, chunksize=max(1, len(shards) // (4 * self.workers)))
+
+        results = [[0, 0, 0] for _ in matchups]
+        for ind, count in zip(owners, counts):
+            for i in range(3):
+                results[ind][i] += count[i]
+        return results
+
+    def round_robin(self):
+        """
+        Function that plays every ordered pair of species (including mirror matches).
+
+        :return: Win-rate matrix, [i][j] is the win rate of i attacking first against j
+        """
+        matchups = [(first, second) for first in self.names for second in self.names]
+        results = iter(self.play(matchups))
+        return [[next(results)[0] / self.battles for _ in self.names] for _ in self.names]
+
+    def swiss(self, rounds=None):
+        """
+        Function that plays a Swiss tournament. Each round pairs species with
+        equal (or close) scores that have not met yet; a pairing plays both
+        orders and the species with the most wins gets a point.
+
+        :param rounds: Number of rounds (ceil(log2(species)) if None)
+        :return: Standings as a list of (name, score), best first
+        """
+        if rounds is None:
+            rounds = max(1, (len(self.names) - 1).bit_length())
+        score = {name: 0.0 for name in self.names}
+        met = {name: set() for name in self.names}
+        had_bye = set()
+
+        for _ in range(rounds):
+            standing = sorted(self.names, key=lambda name: (-score[name], self.names.index(name)))
+            # Give a bye to the lowest ranked species without one
+            if len(standing) % 2:
+                bye = next((name for name in reversed(standing) if name not in had_bye), standing[-1])
+                had_bye.add(bye)
+                score[bye] += 1
+                standing.remove(bye)
+
+            pairings = []
+            while standing:
+                first = standing.pop(0)
+                second = next((name for name in standing if name not in met[first]), standing[0])
+                standing.remove(second)
+                met[first].add(second)
+                met[second].add(first)
+                pairings.append((first, second))
+
+            matchups = [pair for first, second in pairings for pair in ((first, second), (second, first))]
+            results = self.play(matchups)
+            for ind, (first, second) in enumerate(pairings):
+                there, back = results[2*ind], results[2*ind + 1]
+                first_wins = there[0] + back[1]
+                second_wins = there[1] + back[0]
+                if first_wins == second_wins:
+                    score[first] += 0.5
+                    score[second] += 0.5
+                else:
+                    score[first if first_wins > second_wins else second] += 1
+
+        return sorted(score.items(), key=lambda item: (-item[1], self.names.index(item[0])))
+
+
+def format_matrix(names, matrix):
+    """
+    Function that formats a win-rate matrix as a text table.
+
+    :param names: Species names (row and column labels)
+    :param matrix: Win-rate matrix
+    :return: Table as a string
+    """
+    width = max(len(name) for name in names) + 1
+    lines = [" " * width + "".join(f"{name[:width-1]:>{width}}" for name in names)]
+    for name, row in zip(names, matrix):
+        lines.append(f"{name:<{width}}" + "".join(f"{rate:>{width}.3f}" for rate in row))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a battle tournament over every species in pokemon.json.")
+    parser.add_argument('--roster', default='pokemon.json', help="roster json file")
+    parser.add_argument('--format', choices=['round-robin', 'swiss'], default='round-robin')
+    parser.add_argument('--battles', type=int, default=1000, help="battles per ordered matchup")
+    parser.add_argument('--rounds', type=int, help="swiss rounds")
+    parser.add_argument('--policy', nargs=2, choices=list(POLICIES), default=['random', 'random'],
+                        metavar=('FIRST', 'SECOND'), help="move policy of both sides")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shard-size', type=int, default=1000, help="battles per seeded shard")
+    parser.add_argument('--workers', type=int, help="worker processes (default: cpu count)")
+    parser.add_argument('--output', help="write results as json to this file")
+    args = parser.parse_args()
+
+    with open(args.roster) as pokemon_data:
+        pokemons = json.load(pokemon_data)
+    game = tournament(pokemons, args.battles, args.shard_size, args.policy, args.seed, args.workers)
+
+    if args.format == 'round-robin':
+        result = game.round_robin()
+        print(format_matrix(game.names, result))
+        output = {'names': game.names, 'win_rate': result}
+    else:
+        result = game.swiss(args.rounds)
+        for rank, (name, score) in enumerate(result, 1):
+            print(f"{rank}. {name} ({score:g})")
+        output = {'standings': result}
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(output, output_file, indent=4)
+
+if __name__ == '__main__':
+    main()
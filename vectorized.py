@@ -0,0 +1,166 @@
+import numpy as np
+
+# splitmix64 constants (per-battle random number generator)
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+MIX2 = np.uint64(0x94D049BB133111EB)
+POLICIES = ('random', 'greedy')
+
+
+def seed_states(seed, count, offset=0):
+    """
+    Function that creates independent rng states for a range of battles.
+    Battle i always gets the same state for a given seed, no matter how the
+    battles are batched.
+
+    :param seed: Base seed
+    :param count: Number of battles
+    :param offset: Index of the first battle
+    :return: uint64 array of rng states
+    """
+    index = np.arange(offset, offset + count, dtype=np.uint64)
+    return mix(index * GOLDEN + np.uint64(seed % 2**64))
+
+
+def mix(z):
+    """
+    Function that scrambles uint64 values (splitmix64 output function).
+
+    :param z: uint64 array
+    :return: scrambled uint64 array
+    """
+    z = (z ^ (z >> np.uint64(30))) * MIX1
+    z = (z ^ (z >> np.uint64(27))) * MIX2
+    return z ^ (z >> np.uint64(31))
+
+
+class batch_result:
+    """Outcome of a batch of battles (one entry per battle)."""
+    def __init__(self, first, second, winner, turns, hp):
+        """
+        Creates a batch result.
+
+        :param first: Species index of the side attacking first
+        :param second: Species index of the side attacking second
+        :param winner: 0 (first side), 1 (second side) or -1 (draw)
+        :param turns: Number of attacks performed
+        :param hp: Remaining hp, shape (N, 2)
+        """
+        self.first = first
+        self.second = second
+        self.winner = winner
+        self.turns = turns
+        self.hp = hp
+
+    def win_matrix(self, species_count):
+        """
+        Function that counts wins of the first side per (first, second) pair.
+
+        :param species_count: Number of species in the roster
+        :return: (wins, battles) arrays of shape (species_count, species_count)
+        """
+        shape = (species_count, species_count)
+        battles = np.zeros(shape, dtype=np.int64)
+        wins = np.zeros(shape, dtype=np.int64)
+        np.add.at(battles, (self.first, self.second), 1)
+        np.add.at(wins, (self.first, self.second), self.winner == 0)
+        return wins, battles
+
+
+class batch_simulator:
+    """Vectorized battle engine that advances N battles one turn per step."""
+    def __init__(self, pokemons):
+        """
+        Creates a batch simulator.
+
+        :param pokemons: Pokemons to simulate (name -> stats)
+        """
+        self.names = list(pokemons.keys())
+        self.index = {name: ind for ind, name in enumerate(self.names)}
+        max_moves = max(len(stats['moves']) for stats in pokemons.values())
+
+        self.hp = np.array([pokemons[name]['HP'] for name in self.names], dtype=np.int32)
+        self.move_count = np.array([len(pokemons[name]['moves']) for name in self.names], dtype=np.uint64)
+        # Damage table (species x move), padded with zeros
+        self.damage = np.zeros((len(self.names), max_moves), dtype=np.int32)
+        for ind, name in enumerate(self.names):
+            moves = list(pokemons[name]['moves'].values())
+            self.damage[ind, :len(moves)] = moves
+        self.best = self.damage.argmax(axis=1)
+
+    def run(self, first, second, policies=('random', 'random'), seed=0, offset=0, max_turns=1000):
+        """
+        Function that runs a batch of battles to completion.
+
+        :param first: Species indices (or names) of the sides attacking first
+        :param second: Species indices (or names) of the sides attacking second
+        :param policies: Policy per side, 'random' or 'greedy'
+        :param seed: Base seed of the per-battle rng states
+        :param offset: Index of the first battle (for splitting a run over batches)
+        :param max_turns: Attacks after which a battle is called a draw
+        :return: batch_result
+        """
+        for policy in policies:
+            if policy not in POLICIES:
+                raise ValueError(f"Unknown policy '{policy}' (choose from {', '.join(POLICIES)})")
+        first = self.to_index(first)
+        second = self.to_index(second)
+        count = len(first)
+
+        sides = (first, second)
+        hp = np.stack([self.hp[first], self.hp[second]], axis=1)
+        state = seed_states(seed, count, offset)
+        winner = np.full(count, -1, dtype=np.int8)
+        turns = np.full(count, max_turns, dtype=np.int32)
+        active = np.arange(count)   # Battles that are not finished yet
+
+        for turn in range(max_turns):
+            if len(active) == 0:
+                break
+            side = turn % 2         # All battles alternate in lockstep
+            attacker = sides[side][active]
+
+            if policies[side] == 'greedy':
+                move = self.best[attacker]
+            else:
+                state[active] += GOLDEN
+                # Map the top 32 random bits to [0, move count)
+                move = ((mix(state[active]) >> np.uint64(32)) * self.move_count[attacker]) >> np.uint64(32)
+                move = move.astype(np.intp)
+
+            left = hp[active, 1 - side] - self.damage[attacker, move]
+            np.maximum(left, 0, out=left)
+            hp[active, 1 - side] = left
+
+            # Mask out finished battles
+            done = left == 0
+            winner[active[done]] = side
+            turns[active[done]] = turn + 1
+            active = active[~done]
+
+        return batch_result(first, second, winner, turns, hp)
+
+    def all_pairs(self, repeats=1, policies=('random', 'random'), seed=0):
+        """
+        Function that runs every ordered (first, second) pair of species.
+
+        :param repeats: Number of battles per pair
+        :param policies: Policy per side, 'random' or 'greedy'
+        :param seed: Base seed of the per-battle rng states
+        :return: batch_result
+        """
+        count = len(self.names)
+        pairs = np.arange(count * count)
+        pairs = np.repeat(pairs, repeats)
+        return self.run(pairs // count, pairs % count, policies, seed)
+
+    def to_index(self, species):
+        """
+        Function that converts species names to an index array.
+
+        :param species: Sequence of names or indices
+        :return: intp array of species indices
+        """
+        if len(species) and isinstance(species[0], str):
+            species = [self.index[name] for name in species]
+        return np.asarray(species, dtype=np.intp)